@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title
+from .models import Category, Comment, Genre, OutboxEmail, Review, Title
 
 # @admin.register(Title)
 # class TitleAdmin(admin.ModelAdmin):
@@ -37,3 +37,4 @@ admin.site.register(Genre)
 admin.site.register(Category)
 admin.site.register(Review)
 admin.site.register(Comment)
+admin.site.register(OutboxEmail)
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+# Поля пользователя, которые User._generate_jwt_token кладёт в токен
+# для режима AUTH_STATELESS_TOKENS.
+TOKEN_USER_CLAIMS = ('username', 'email', 'role')
+
+
+class UserCache:
+    """LRU-кеш снимков пользователей с TTL, свой в каждом процессе.
+
+    Хранятся значения полей, а не сами объекты: каждый запрос получает
+    собственный экземпляр User, который можно менять.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, values):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE,
+                       settings.AUTH_USER_CACHE_TTL)
+
+
+def snapshot(user):
+    return tuple(getattr(user, field.attname)
+                 for field in User._meta.concrete_fields)
+
+
+def from_snapshot(values):
+    field_names = [field.attname for field in User._meta.concrete_fields]
+    return User.from_db('default', field_names, values)
+
+
+def from_claims(validated_token, user_id):
+    # Неполный пользователь без обращения к БД: для проверки прав
+    # хватает id и роли. Сохранять такой объект нельзя.
+    user = User(id=user_id, is_active=True,
+                **{claim: validated_token[claim]
+                   for claim in TOKEN_USER_CLAIMS})
+    user._state.adding = False
+    user._state.db = 'default'
+    user.from_claims = True
+    return user
+
+
+def load_user(user_id):
+    """Пользователь из user_cache или из БД (User.DoesNotExist)."""
+    values = user_cache.get(user_id)
+    if values is not None:
+        return from_snapshot(values)
+    user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+    user_cache.set(user_id, snapshot(user))
+    return user
+
+
+def full_user(user):
+    """user со всеми полями: собранный из claims загружается заново."""
+    if getattr(user, 'from_claims', False):
+        return load_user(user.pk)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication без SELECT пользователя на каждый запрос.
+
+    Пользователь берётся из user_cache, а с AUTH_STATELESS_TOKENS -
+    прямо из claims токена, если они там есть.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        if settings.AUTH_STATELESS_TOKENS and all(
+                claim in validated_token for claim in TOKEN_USER_CLAIMS):
+            return from_claims(validated_token, user_id)
+        try:
+            user = load_user(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'),
+                                       code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'),
+                                       code='user_inactive')
+        return user
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+
+class BatchTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком много объектов в одном запросе.'
+    default_code = 'batch_too_large'
+
+
+def insert_objects(objects):
+    """Вставляет объекты одной пачкой и проставляет им id."""
+    if not objects:
+        return
+    if connection.features.can_return_ids_from_bulk_insert:
+        type(objects[0]).objects.bulk_create(objects)
+        return
+    # Без INSERT ... RETURNING (SQLite) id новых строк не узнать,
+    # поэтому вставляем по одной, но в той же транзакции.
+    for obj in objects:
+        obj.save(force_insert=True)
+
+
+class BatchCreateMixin:
+    """POST со списком объектов создаёт их все за один запрос.
+
+    Элементы проверяются по одному, связанные объекты для всех элементов
+    загружаются заранее (get_related_objects), корректные элементы
+    пишутся одной транзакцией (perform_batch_create). В ответе для
+    каждого элемента его статус и данные или ошибки; общий статус 201,
+    если создано всё, 207, если часть, и 400, если ничего.
+    """
+    batch_serializer_class = None
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        self.check_batch_permissions(request)
+        items = request.data
+        if len(items) > settings.BATCH_CREATE_MAX_ITEMS:
+            raise BatchTooLarge(
+                f'Не больше {settings.BATCH_CREATE_MAX_ITEMS} объектов '
+                f'за один запрос.'
+            )
+        context = self.get_serializer_context()
+        context['related_objects'] = self.get_related_objects(items)
+        serializer_class = self.get_batch_serializer_class()
+        results = [None] * len(items)
+        pending = {}
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item, context=context)
+            if serializer.is_valid():
+                pending[index] = serializer
+            else:
+                results[index] = serializer.errors
+        for index, errors in self.get_batch_errors(pending).items():
+            del pending[index]
+            results[index] = errors
+        results = [
+            {'status': status.HTTP_400_BAD_REQUEST, 'errors': errors}
+            for errors in results
+        ]
+        if pending:
+            try:
+                with transaction.atomic():
+                    instances = self.perform_batch_create(
+                        [serializer.validated_data
+                         for serializer in pending.values()]
+                    )
+            except IntegrityError:
+                raise ValidationError(
+                    'Конфликт с существующими записями, повторите запрос.'
+                )
+            for (index, serializer), instance in zip(pending.items(),
+                                                     instances):
+                serializer.instance = instance
+                results[index] = {'status': status.HTTP_201_CREATED,
+                                  'data': serializer.data}
+        return Response(results, status=self.batch_status(len(pending),
+                                                          len(items)))
+
+    @staticmethod
+    def batch_status(created, total):
+        if created == total:
+            return status.HTTP_201_CREATED
+        if created:
+            return status.HTTP_207_MULTI_STATUS
+        return status.HTTP_400_BAD_REQUEST
+
+    def check_batch_permissions(self, request):
+        pass
+
+    def get_batch_serializer_class(self):
+        return self.batch_serializer_class or self.get_serializer_class()
+
+    def get_related_objects(self, items):
+        """{модель: {slug: объект}} для всех ссылок из элементов."""
+        return {}
+
+    def get_batch_errors(self, pending):
+        """Ошибки, видные только на всей пачке.
+
+        pending - {номер элемента: проверенный сериализатор}, результат -
+        {номер элемента: ошибки}.
+        """
+        return {}
+
+    def perform_batch_create(self, validated):
+        raise NotImplementedError
@@ -0,0 +1,41 @@
+"""Файловый кеш версий моделей и блокировок single_flight.
+
+В отличие от FileBasedCache, add() атомарен между процессами: файл
+ключа появляется через os.link, который не перезаписывает уже
+существующий файл. Записи не вытесняются, поэтому кеш годится только
+для небольшого числа ключей - версий моделей и коротких блокировок, -
+а не для ответов.
+"""
+import os
+import tempfile
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class AtomicFileBasedCache(FileBasedCache):
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            try:
+                os.link(tmp_path, fname)
+                return True
+            except FileExistsError:
+                # has_key удаляет просроченный файл, тогда ключ свободен.
+                if self.has_key(key, version):
+                    return False
+            try:
+                os.link(tmp_path, fname)
+                return True
+            except FileExistsError:
+                return False
+        finally:
+            os.remove(tmp_path)
+
+    def _cull(self):
+        pass
@@ -0,0 +1,248 @@
+import gzip
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .routers import current_replica
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}:{}:{}'
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def get_version_cache():
+    # Отдельный кеш: вытесненная версия вернула бы старые ответы,
+    # а блокировкам single_flight нужен атомарный add.
+    return caches[settings.RESPONSE_CACHE_VERSIONS_ALIAS]
+
+
+def _new_version():
+    # Время изменения и случайный хвост, а не incr: потерянный из-за
+    # гонки инкремент не вернёт старую версию, а вытесненный ключ не
+    # совпадёт с прежним.
+    return f'{time.time():.6f}.{uuid.uuid4().hex[:8]}'
+
+
+def version_timestamp(version):
+    return float(version.rsplit('.', 1)[0])
+
+
+def get_version_map(names):
+    cache = get_version_cache()
+    keys = {name: VERSION_KEY.format(name) for name in names}
+    versions = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return {name: versions[key] for name, key in keys.items()}
+
+
+def get_versions(names):
+    return '-'.join(get_version_map(names).values())
+
+
+def replica_may_lag(names):
+    """Данные моделей names менялись позже, чем REPLICA_MAX_LAG назад."""
+    newest = max(map(version_timestamp, get_version_map(names).values()),
+                 default=0)
+    return time.time() - newest < settings.REPLICA_MAX_LAG
+
+
+def _set_new_version(name):
+    get_version_cache().set(VERSION_KEY.format(name), _new_version(), None)
+
+
+def bump_version(name):
+    """Делает устаревшими все ответы, зависящие от модели name.
+
+    Внутри транзакции версия меняется ещё раз после коммита: иначе
+    параллельный запрос успел бы закешировать старые данные под новой
+    версией.
+    """
+    _set_new_version(name)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _set_new_version(name))
+
+
+def single_flight(key, compute, timeout):
+    """Значение из кеша или compute(), но не больше одного вычисления.
+
+    Первый промахнувшийся запрос берёт блокировку через add в кеше
+    версий, остальные ждут, пока он положит результат. compute() может вернуть
+    None, тогда ничего не кешируется.
+    """
+    cache = get_cache()
+    locks = get_version_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+    lock_key = f'{key}:lock'
+    if not locks.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(settings.RESPONSE_CACHE_LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        # Вычисляющий запрос не успел или упал: считаем сами.
+        return compute()
+    try:
+        entry = compute()
+        if entry is not None:
+            cache.set(key, entry, timeout)
+    finally:
+        locks.delete(lock_key)
+    return entry
+
+
+class CachedResponseMixin:
+    """Кеш GET-ответов list/retrieve по версиям моделей из cache_versions.
+
+    Тело хранится сжатым gzip и отдаётся как есть клиентам, которые
+    принимают gzip. Кешируются только JSON-ответы со статусом 200.
+    """
+    cache_versions = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        fingerprint = hashlib.sha1(
+            f'{request.get_full_path()}|{request.accepted_media_type}'
+            .encode()
+        ).hexdigest()
+        return RESPONSE_KEY.format(
+            type(self).__name__, get_versions(self.cache_versions),
+            fingerprint
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if (not settings.RESPONSE_CACHE_ENABLED
+                or request.accepted_renderer.format != 'json'):
+            return handler(request, *args, **kwargs)
+        computed = {}
+
+        def compute():
+            response = handler(request, *args, **kwargs)
+            computed['response'] = response
+            if response.status_code != 200:
+                return None
+            # Реплика могла ещё не получить последнюю правку: такой ответ
+            # под новой версией закешировал бы старые данные.
+            if current_replica() and replica_may_lag(self.cache_versions):
+                return None
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            return {
+                'content_type': response['Content-Type'],
+                'body': gzip.compress(response.content),
+            }
+
+        entry = single_flight(self.get_response_cache_key(request),
+                              compute, settings.RESPONSE_CACHE_TIMEOUT)
+        if 'response' in computed:
+            response = computed['response']
+            response['X-Cache'] = 'MISS'
+        else:
+            response = self.build_cached_response(request, entry)
+            response['X-Cache'] = 'HIT'
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        return response
+
+    def build_cached_response(self, request, entry):
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if 'gzip' in accept_encoding:
+            response = HttpResponse(entry['body'],
+                                    content_type=entry['content_type'])
+            response['Content-Encoding'] = 'gzip'
+            return response
+        return HttpResponse(gzip.decompress(entry['body']),
+                            content_type=entry['content_type'])
+
+
+class ConditionalResponseMixin:
+    """ETag и Last-Modified для list/retrieve, 304 без сериализации.
+
+    Валидаторы строятся из версий get_validator_versions() и
+    get_validator_latest() - последней строки коллекции: её id и даты
+    validator_date_field (по умолчанию из get_validator_queryset()).
+    get_validator_latest() же отвечает за 404 для удалённого родителя:
+    иначе старый ETag получил бы 304. Это один поиск по индексу; COUNT не
+    берём, он линеен по размеру коллекции. Правки и удаления ловят
+    версии, последняя строка - вставки в обход сигналов.
+    """
+    validator_versions = ()
+    validator_date_field = None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
+
+    def get_validator_versions(self):
+        return self.validator_versions
+
+    def get_validator_queryset(self):
+        return None
+
+    def get_validator_latest(self):
+        queryset = self.get_validator_queryset()
+        if queryset is None:
+            return None
+        fields = ['pk']
+        if self.validator_date_field:
+            fields.append(self.validator_date_field)
+        return queryset.order_by('-pk').values_list(*fields).first()
+
+    def get_validators(self, request):
+        versions = get_version_map(self.get_validator_versions())
+        parts = [request.get_full_path(), request.accepted_media_type,
+                 *versions.values()]
+        last_modified = max(map(version_timestamp, versions.values()),
+                            default=0)
+        latest = self.get_validator_latest()
+        parts.append(latest)
+        if latest and self.validator_date_field:
+            last_modified = max(last_modified, latest[1].timestamp())
+        etag = hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()
+        return quote_etag(etag), int(last_modified)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        # Как и в cached_response: реплика могла ещё не получить правку,
+        # и ETag новой версии подтвердил бы устаревшее тело.
+        if (current_replica()
+                and replica_may_lag(self.get_validator_versions())):
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            not_modified['Last-Modified'] = http_date(last_modified)
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,79 @@
+import datetime as dt
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import (constant_time_compare, get_random_string,
+                                 salted_hmac)
+
+from .models import ConfirmationCode
+
+CODE_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+HMAC_SALT = 'api.confirmation.ConfirmationCode'
+
+
+class InvalidConfirmationCode(Exception):
+    pass
+
+
+def hash_code(user_id, code):
+    # Ключ HMAC выводится из SECRET_KEY, id пользователя не даёт
+    # переносить хеш между учётными записями.
+    return salted_hmac(HMAC_SALT, f'{user_id}:{code.upper()}').hexdigest()
+
+
+def issue_code(user):
+    """Создаёт новый код пользователя взамен прежнего и возвращает его."""
+    code = get_random_string(settings.CONFIRMATION_CODE_LENGTH,
+                             CODE_ALPHABET)
+    ConfirmationCode.objects.update_or_create(
+        user=user,
+        defaults={
+            'code_hash': hash_code(user.pk, code),
+            'expires_at': timezone.now() + dt.timedelta(
+                seconds=settings.CONFIRMATION_CODE_TTL
+            ),
+            'attempts': 0,
+        }
+    )
+    return code
+
+
+def redeem_code(email, code):
+    """Проверяет и гасит код, возвращает пользователя.
+
+    Попытка резервируется условным UPDATE до сравнения, поэтому
+    параллельный перебор не превысит CONFIRMATION_CODE_MAX_ATTEMPTS.
+    """
+    record = (ConfirmationCode.objects.select_related('user')
+              .filter(user__email=email).first())
+    if record is None:
+        raise InvalidConfirmationCode(
+            'A user with this email and confirmation_code was not found.'
+        )
+    if record.expires_at <= timezone.now():
+        record.delete()
+        raise InvalidConfirmationCode(
+            'The confirmation_code has expired, request a new one.'
+        )
+    reserved = ConfirmationCode.objects.filter(
+        pk=record.pk,
+        attempts__lt=settings.CONFIRMATION_CODE_MAX_ATTEMPTS
+    ).update(attempts=F('attempts') + 1)
+    if not reserved:
+        raise InvalidConfirmationCode(
+            'Too many attempts, request a new confirmation_code.'
+        )
+    if not constant_time_compare(record.code_hash,
+                                 hash_code(record.user_id, code)):
+        raise InvalidConfirmationCode(
+            'A user with this email and confirmation_code was not found.'
+        )
+    deleted, _ = ConfirmationCode.objects.filter(
+        pk=record.pk, code_hash=record.code_hash
+    ).delete()
+    if not deleted:
+        raise InvalidConfirmationCode(
+            'The confirmation_code has already been used.'
+        )
+    return record.user
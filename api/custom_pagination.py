@@ -1,5 +1,37 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CustomCursorPaginationClass(CursorPagination):
+    page_size = 10
+    ordering = '-id'
 
 
 class CustomPaginationClass(PageNumberPagination):
+    """Постраничная пагинация с курсорным режимом по запросу.
+
+    ?pagination=cursor (или уже полученный ?cursor=) включает keyset-режим
+    по -id: без COUNT и OFFSET, страницы не сдвигаются при вставке новых
+    записей. Без параметра ответ остаётся прежним.
+    """
     page_size = 10
+    mode_query_param = 'pagination'
+    cursor_paginator_class = CustomCursorPaginationClass
+
+    def use_cursor(self, request):
+        cursor_param = self.cursor_paginator_class.cursor_query_param
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or cursor_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_paginator_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,211 @@
+"""Планы SQL-запросов эндпоинтов API.
+
+check_endpoints() выполняет в процессе GET-запросы из ENDPOINTS,
+запоминает их SELECT-запросы и получает для каждого план СУБД через
+EXPLAIN. Проблемой считается полный просмотр таблицы и сортировка:
+и то и другое значит, что запросу не хватает индекса под его фильтр и
+порядок.
+
+PostgreSQL на маленьких таблицах выбирает seq scan при любых индексах,
+поэтому план строится с enable_seqscan и enable_sort = off: тогда Seq
+Scan и Sort остаются в плане только там, где индекса нет. SQLite
+показывает как SCAN и упорядоченный обход по первичному ключу, которым
+список идёт страницами, поэтому полный просмотр там проблема только в
+запросе с WHERE.
+
+Сортировка не считается проблемой в запросах по списку ключей
+(prefetch_related): они читают строки одной страницы, и сортировать
+их дёшево. Группировка отфильтрованных строк (фасеты) - тоже: в
+PostgreSQL это HashAggregate, а SQLite показывает её как TEMP B-TREE
+FOR GROUP BY.
+"""
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from .leaderboards import rebuild_leaderboards
+from .models import Category, Comment, Genre, Review, Title
+from .ratings import rebuild_ratings
+
+ENDPOINTS = {
+    'titles': '/api/v1/titles/',
+    'titles_cursor': '/api/v1/titles/?pagination=cursor',
+    'titles_by_genre': '/api/v1/titles/?genre={genre}',
+    'titles_by_genres_all': '/api/v1/titles/?genre={genres}&genre_mode=all',
+    'titles_by_category': '/api/v1/titles/?category={category}',
+    'titles_by_year': '/api/v1/titles/?year={year}',
+    'title': '/api/v1/titles/{title}/',
+    'facets': '/api/v1/titles/facets/',
+    'facets_by_genre': '/api/v1/titles/facets/?genre={genre}',
+    'reviews': '/api/v1/titles/{title}/reviews/',
+    'review': '/api/v1/titles/{title}/reviews/{review}/',
+    'comments': '/api/v1/titles/{title}/reviews/{review}/comments/',
+    'leaderboard': '/api/v1/leaderboards/',
+    'leaderboard_by_genre': '/api/v1/leaderboards/genres/{genre}/',
+}
+# icontains и полнотекстовый поиск индексируются только в PostgreSQL
+# (триграммы и GIN по search_vector).
+POSTGRES_ENDPOINTS = {
+    'titles_by_name': '/api/v1/titles/?name={name}',
+    'titles_search': '/api/v1/titles/?search={name}',
+}
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?\w+(?: AS \w+)?$')
+KEY_LIST = re.compile(r'WHERE \S+ IN \((?:%s, )*%s\)(?: ORDER BY [^()]*)?$')
+
+
+def seed(titles=200, reviews=5, comments=2):
+    """Каталог для проверки планов, возвращает значения для ENDPOINTS."""
+    User = get_user_model()
+    authors = User.objects.bulk_create([
+        User(username=f'explain{number}', email=f'explain{number}@yamdb.fake')
+        for number in range(reviews)
+    ])
+    authors = list(User.objects.filter(
+        username__in=[author.username for author in authors]
+    ))
+    genres = Genre.objects.bulk_create([
+        Genre(name=f'Explain genre {number}', slug=f'explain-genre-{number}')
+        for number in range(10)
+    ])
+    genres = list(Genre.objects.filter(slug__startswith='explain-genre-'))
+    categories = Category.objects.bulk_create([
+        Category(name=f'Explain category {number}',
+                 slug=f'explain-category-{number}')
+        for number in range(5)
+    ])
+    categories = list(Category.objects.filter(
+        slug__startswith='explain-category-'
+    ))
+    Title.objects.bulk_create([
+        Title(name=f'Explain title {number}', year=1950 + number % 70,
+              category=categories[number % len(categories)])
+        for number in range(titles)
+    ])
+    catalog = list(Title.objects.filter(name__startswith='Explain title '))
+    through = Title.genre.through
+    through.objects.bulk_create([
+        through(title_id=title.pk, genre_id=genres[index % len(genres)].pk)
+        for index, title in enumerate(catalog)
+    ])
+    Review.objects.bulk_create([
+        Review(title=title, author=author, text='Текст', score=index % 10 + 1)
+        for title in catalog
+        for index, author in enumerate(authors)
+    ])
+    review = Review.objects.filter(title__in=catalog).order_by('id').first()
+    Comment.objects.bulk_create([
+        Comment(review_id=review_id, author=authors[0], text='Текст')
+        for review_id in Review.objects.filter(
+            title__in=catalog
+        ).values_list('id', flat=True)
+        for _ in range(comments)
+    ])
+    rebuild_ratings(Title.objects.filter(pk__in=[t.pk for t in catalog]))
+    rebuild_leaderboards()
+    return {
+        'genre': genres[0].slug,
+        'genres': f'{genres[0].slug},{genres[1].slug}',
+        'category': categories[0].slug,
+        'year': review.title.year,
+        'title': review.title_id,
+        'review': review.pk,
+        'name': 'title',
+    }
+
+
+def capture_queries(path, client=None):
+    """Статус ответа на GET path и его SELECT-запросы с параметрами."""
+    client = client or Client()
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        response = client.get(path, HTTP_ACCEPT='application/json')
+    return response.status_code, queries
+
+
+def _postgres_nodes(node, depth=0):
+    yield node, depth
+    for child in node.get('Plans', ()):
+        yield from _postgres_nodes(child, depth + 1)
+
+
+def _explain_postgres(cursor, sql, params, sort_allowed):
+    cursor.execute('SET LOCAL enable_seqscan = off')
+    cursor.execute('SET LOCAL enable_sort = off')
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines, problems = [], []
+    for node, depth in _postgres_nodes(plan[0]['Plan']):
+        line = node['Node Type']
+        if 'Relation Name' in node:
+            line += f' on {node["Relation Name"]}'
+        if 'Index Name' in node:
+            line += f' using {node["Index Name"]}'
+        lines.append('  ' * depth + line)
+        if node['Node Type'] == 'Seq Scan':
+            problems.append(line)
+        elif (node['Node Type'] in ('Sort', 'Incremental Sort')
+              and not sort_allowed):
+            problems.append(f'{line} by {", ".join(node["Sort Key"])}')
+    cursor.execute('RESET enable_seqscan')
+    cursor.execute('RESET enable_sort')
+    return lines, problems
+
+
+def _explain_sqlite(cursor, sql, params, sort_allowed):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    lines = [row[3] for row in cursor.fetchall()]
+    filtered = ' WHERE ' in sql.upper()
+    problems = [
+        line for line in lines
+        if (line.startswith('USE TEMP B-TREE') and not sort_allowed
+            and not line.endswith('FOR GROUP BY'))
+        or (filtered and SQLITE_SCAN.match(line))
+    ]
+    return lines, problems
+
+
+def explain(sql, params):
+    """Строки плана запроса и найденные в нём проблемы."""
+    sort_allowed = bool(KEY_LIST.search(sql.strip()))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            return _explain_postgres(cursor, sql, params, sort_allowed)
+        return _explain_sqlite(cursor, sql, params, sort_allowed)
+
+
+def endpoints():
+    if connection.vendor == 'postgresql':
+        return {**ENDPOINTS, **POSTGRES_ENDPOINTS}
+    return dict(ENDPOINTS)
+
+
+def check_endpoints(values):
+    """{эндпоинт: (путь, статус, [(sql, params, план, проблемы)])}.
+
+    Кеш ответов и реплики выключаются: нужны запросы к этой базе.
+    SET LOCAL для PostgreSQL требует вызова внутри транзакции.
+    """
+    client = Client()
+    results = {}
+    with override_settings(RESPONSE_CACHE_ENABLED=False,
+                           DATABASE_REPLICAS=[]):
+        for name, template in endpoints().items():
+            path = template.format(**values)
+            status, queries = capture_queries(path, client)
+            results[name] = (path, status, [
+                (sql, params, *explain(sql, params))
+                for sql, params in queries
+            ])
+    return results
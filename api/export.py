@@ -0,0 +1,52 @@
+import json
+from itertools import islice
+
+from .models import Title
+
+
+def _title_row(title, genres):
+    category = title.category
+    rating = title.rating
+    # Те же поля и формат, что у TitleReadSerializer.
+    return {
+        'id': title.id,
+        'name': title.name,
+        'rating': int(rating) if rating is not None else None,
+        'description': title.description,
+        'year': title.year,
+        'genre': genres.get(title.id, []),
+        'category': ({'name': category.name, 'slug': category.slug}
+                     if category else None),
+    }
+
+
+def _genres_for(title_ids):
+    genres = {}
+    rows = (Title.genre.through.objects.filter(title_id__in=title_ids)
+            .order_by('title_id', 'genre_id')
+            .values_list('title_id', 'genre__name', 'genre__slug'))
+    for title_id, name, slug in rows:
+        genres.setdefault(title_id, []).append({'name': name, 'slug': slug})
+    return genres
+
+
+def export_titles(queryset=None, chunk_size=2000):
+    """Строки NDJSON с произведениями, по мере чтения из БД.
+
+    Произведения читаются iterator() (на PostgreSQL - серверным
+    курсором), жанры подгружаются одним запросом на каждые chunk_size
+    строк: prefetch_related с iterator() в Django 2.2 не работает.
+    """
+    if queryset is None:
+        queryset = Title.objects.all()
+    titles = (queryset.select_related('category').defer('search_vector')
+              .order_by('id').iterator(chunk_size=chunk_size))
+    while True:
+        chunk = list(islice(titles, chunk_size))
+        if not chunk:
+            return
+        genres = _genres_for([title.id for title in chunk])
+        yield ''.join(
+            json.dumps(_title_row(title, genres), ensure_ascii=False) + '\n'
+            for title in chunk
+        )
@@ -0,0 +1,47 @@
+"""Счётчики произведений по жанрам, категориям и годам.
+
+facet_counts() получает queryset списка произведений с уже
+применёнными фильтрами и считает каждый фасет одним GROUP BY по
+подзапросу id этого списка (без фильтров - по всей таблице, по
+индексам из Meta.indexes): число запросов не зависит от числа жанров,
+категорий и лет. Жанры и категории возвращаются все, в том числе с
+нулём, года - только встречающиеся в выборке.
+"""
+from django.db.models import Count
+
+from .models import Category, Genre, Title
+
+
+def _buckets(objects, counts):
+    return [
+        {'slug': slug, 'name': name, 'count': counts.get(pk, 0)}
+        for pk, slug, name in objects.values_list('id', 'slug', 'name')
+    ]
+
+
+def facet_counts(queryset):
+    through = Title.genre.through.objects.using(queryset.db)
+    if queryset.query.has_filters():
+        through = through.filter(
+            title_id__in=queryset.order_by().values('pk')
+        )
+    genres = dict(
+        through.values('genre_id')
+        .annotate(count=Count('title_id')).values_list('genre_id', 'count')
+        .order_by()
+    )
+    categories = dict(
+        queryset.order_by().values('category_id')
+        .annotate(count=Count('pk')).values_list('category_id', 'count')
+    )
+    years = (queryset.order_by().exclude(year=None).values('year')
+             .annotate(count=Count('pk')).order_by('year'))
+    return {
+        'count': sum(categories.values()),
+        'genre': _buckets(Genre.objects.using(queryset.db)
+                          .order_by('name', 'id'), genres),
+        'category': _buckets(Category.objects.using(queryset.db)
+                             .order_by('name', 'id'), categories),
+        'year': [{'year': row['year'], 'count': row['count']}
+                 for row in years],
+    }
@@ -0,0 +1,131 @@
+"""?fields= и ?omit= для list и retrieve.
+
+?fields=id,name оставляет в ответе только перечисленные поля
+сериализатора, ?omit=description - все, кроме перечисленных. Выбор
+доходит и до SQL: queryset читает через only() только столбцы, нужные
+оставшимся полям, а select_related и prefetch_related для выброшенных
+связей снимаются, так что их JOIN и запросы не выполняются, а вложенные
+сериализаторы не создаются.
+
+Поле, которое читает не столбец модели (свойство, метод), указывается
+в sparse_sources вьюсета вместе со столбцами, от которых зависит. Если
+источник поля неизвестен, столбцы не ограничиваются.
+"""
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _select_related_paths(related, prefix=''):
+    for name, nested in related.items():
+        yield prefix + name
+        yield from _select_related_paths(nested, f'{prefix}{name}__')
+
+
+def project(queryset, sources):
+    """queryset, читающий только столбцы и связи из sources.
+
+    sources - имена полей модели; None - queryset без изменений.
+    """
+    if sources is None:
+        return queryset
+    opts = queryset.model._meta
+    columns = {opts.pk.name}
+    columns.update(field.name for field in opts.concrete_fields
+                   if field.name in sources)
+    related = queryset.query.select_related
+    if isinstance(related, dict):
+        paths = [path for path in _select_related_paths(related)
+                 if path.split('__')[0] in sources]
+        # select_related() без аргументов пошёл бы по всем FK.
+        queryset = queryset.select_related(None)
+        if paths:
+            queryset = queryset.select_related(*paths)
+    lookups = queryset._prefetch_related_lookups
+    if lookups:
+        queryset = queryset.prefetch_related(None).prefetch_related(*[
+            lookup for lookup in lookups
+            if getattr(lookup, 'prefetch_through', lookup).split('__')[0]
+            in sources
+        ])
+    return queryset.only(*columns)
+
+
+class SparseFieldsetMixin:
+    """?fields= и ?omit= для list и retrieve вьюсета.
+
+    sparse_sources - {поле сериализатора: (поля модели, ...)} для полей,
+    чей source не поле модели.
+    """
+    sparse_actions = ('list', 'retrieve')
+    sparse_sources = {}
+
+    def get_sparse_serializer_fields(self):
+        return self.get_serializer_class()(
+            context=self.get_serializer_context()
+        ).fields
+
+    def get_sparse_fields(self):
+        """Имена оставляемых полей сериализатора или None - все."""
+        if getattr(self, 'action', None) not in self.sparse_actions:
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self.parse_sparse_fields()
+        return self._sparse_fields
+
+    def parse_sparse_fields(self):
+        params = self.request.query_params
+        fields = _names(params.get(FIELDS_PARAM, ''))
+        omit = _names(params.get(OMIT_PARAM, ''))
+        if not fields and not omit:
+            return None
+        available = list(self.get_sparse_serializer_fields())
+        unknown = sorted(set(fields + omit) - set(available))
+        if unknown:
+            raise ValidationError({
+                FIELDS_PARAM if set(unknown) & set(fields) else OMIT_PARAM:
+                    [f"Unknown fields: {', '.join(unknown)}"]
+            })
+        selected = fields or available
+        return [name for name in available
+                if name in selected and name not in omit]
+
+    def get_sparse_sources(self, names):
+        """Поля модели, нужные полям names, или None, если неизвестно."""
+        opts = self.get_serializer_class().Meta.model._meta
+        model_fields = {field.name for field in opts.get_fields()}
+        fields = self.get_sparse_serializer_fields()
+        sources = set()
+        for name in names:
+            if name in self.sparse_sources:
+                sources.update(self.sparse_sources[name])
+                continue
+            source = fields[name].source.split('.')[0]
+            if source not in model_fields:
+                return None
+            sources.add(source)
+        return sources
+
+    def filter_queryset(self, queryset):
+        # filter_queryset, а не get_queryset: get_queryset вьюсеты
+        # переопределяют сами.
+        queryset = super().filter_queryset(queryset)
+        names = self.get_sparse_fields()
+        if names is None:
+            return queryset
+        return project(queryset, self.get_sparse_sources(names))
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_sparse_fields()
+        if names is not None:
+            fields = getattr(serializer, 'child', serializer).fields
+            for name in list(fields):
+                if name not in names:
+                    fields.pop(name)
+        return serializer
@@ -1,14 +1,74 @@
-from django_filters.filters import CharFilter
+from django_filters.filters import BooleanFilter, CharFilter, ChoiceFilter
 from django_filters.rest_framework.filterset import FilterSet
+from rest_framework.filters import BaseFilterBackend, SearchFilter
 
+from .genre_index import filter_by_genres
 from .models import Title
+from .search import get_search_backend, get_trigram_backend
+
+FUZZY_PARAM = 'fuzzy'
+FUZZY_VALUES = ('1', 'true', 'True', 'yes')
+GENRE_MODES = (('any', 'any'), ('all', 'all'))
+
+
+def is_fuzzy(request_data):
+    return request_data.get(FUZZY_PARAM) in FUZZY_VALUES
 
 
 class TitleFilter(FilterSet):
-    name = CharFilter(lookup_expr='icontains')
+    name = CharFilter(method='filter_name')
+    # ?fuzzy=true переключает name на поиск по сходству с опечатками.
+    fuzzy = BooleanFilter(method='filter_fuzzy')
     category = CharFilter(field_name='category__slug')
-    genre = CharFilter(field_name='genre__slug')
+    # ?genre=a,b - произведения с любым из жанров, с genre_mode=all -
+    # со всеми сразу.
+    genre = CharFilter(method='filter_genre')
+    genre_mode = ChoiceFilter(choices=GENRE_MODES, method='filter_genre_mode')
 
     class Meta:
         model = Title
         fields = ['name', 'category', 'genre', 'year']
+
+    def filter_name(self, queryset, name, value):
+        if is_fuzzy(self.data):
+            return get_trigram_backend(queryset.db).similar(
+                queryset, name, value
+            )
+        return queryset.filter(name__icontains=value)
+
+    def filter_fuzzy(self, queryset, name, value):
+        return queryset
+
+    def filter_genre(self, queryset, name, value):
+        slugs = [slug.strip() for slug in value.split(',') if slug.strip()]
+        if not slugs:
+            return queryset
+        mode = self.form.cleaned_data.get('genre_mode') or 'any'
+        return filter_by_genres(queryset, slugs, mode)
+
+    def filter_genre_mode(self, queryset, name, value):
+        return queryset
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """?search= по названию и описанию, упорядоченный по релевантности."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return get_search_backend(queryset.db).search(queryset, query)
+
+
+class TrigramSearchFilter(SearchFilter):
+    """SearchFilter с нечётким режимом ?fuzzy=true по первому полю."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms or not is_fuzzy(request.query_params):
+            return super().filter_queryset(request, queryset, view)
+        field = self.get_search_fields(view, request)[0]
+        return get_trigram_backend(queryset.db).similar(
+            queryset, field, terms
+        )
@@ -0,0 +1,182 @@
+"""Индекс жанров произведений в памяти процесса.
+
+Для каждого жанра хранится битовая маска произведений: бит i стоит,
+если у произведения с id i есть этот жанр. Маски - целые Python, так
+что ?genre=a,b&genre_mode=all - это AND масок, а any - OR, без JOIN с
+api_title_genre. Найденные id передаются в SQL одним параметром
+(JSON-массив для SQLite, массив для PostgreSQL), а не списком из тысяч
+плейсхолдеров. Размер параметра и его разбор в БД растут с числом
+найденных произведений, поэтому выше GENRE_INDEX_MAX_IDS id фильтр
+уходит на JOIN через ORM.
+
+Индекс строится одним чтением api_title_genre при первом запросе и
+помечается версией 'title_genre' из api.caching. Изменения жанров
+произведений в этом процессе применяются к маскам сразу после коммита
+(api.signals), изменения в других процессах меняют версию, и индекс
+перестраивается при следующем запросе. Кроме того, он перестраивается
+не реже раза в GENRE_INDEX_MAX_AGE секунд.
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import AutoField, Lookup
+
+from .caching import get_version_map
+from .models import Genre, Title
+
+VERSION = 'title_genre'
+# Позиции единичных битов для каждого значения байта.
+BYTE_BITS = [[bit for bit in range(8) if value >> bit & 1]
+             for value in range(256)]
+
+
+def mask_of(title_ids):
+    mask = 0
+    for title_id in title_ids:
+        mask |= 1 << title_id
+    return mask
+
+
+def count_of(mask):
+    """Число произведений в маске."""
+    return bin(mask).count('1')
+
+
+def ids_of(mask):
+    """id произведений из маски по возрастанию."""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    return [index * 8 + bit
+            for index, value in enumerate(data) if value
+            for bit in BYTE_BITS[value]]
+
+
+class GenreIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.masks = None
+        self.slugs = {}
+        self.version = None
+        self.built_at = 0.0
+
+    def current_version(self):
+        return get_version_map((VERSION, ))[VERSION]
+
+    def is_fresh(self):
+        return (self.masks is not None
+                and self.version == self.current_version()
+                and time.monotonic() - self.built_at
+                < settings.GENRE_INDEX_MAX_AGE)
+
+    def build(self):
+        # Версию берём до чтения: изменение во время чтения сменит её,
+        # и следующий запрос перестроит индекс ещё раз.
+        version = self.current_version()
+        buffers = {}
+        through = Title.genre.through.objects.using(DEFAULT_DB_ALIAS)
+        rows = through.values_list('genre_id', 'title_id').order_by()
+        for genre_id, title_id in rows.iterator():
+            buffer = buffers.setdefault(genre_id, bytearray())
+            index = title_id >> 3
+            if index >= len(buffer):
+                buffer.extend(bytes(index + 1 - len(buffer)))
+            buffer[index] |= 1 << (title_id & 7)
+        masks = {genre_id: int.from_bytes(buffer, 'little')
+                 for genre_id, buffer in buffers.items()}
+        slugs = dict(Genre.objects.using(DEFAULT_DB_ALIAS)
+                     .values_list('slug', 'id'))
+        with self.lock:
+            self.masks, self.slugs = masks, slugs
+            self.version = version
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if not self.is_fresh():
+            self.build()
+
+    def match(self, slugs, mode):
+        """Маска произведений с любым (any) или всеми (all) жанрами."""
+        self.ensure_fresh()
+        with self.lock:
+            masks = [self.masks.get(self.slugs.get(slug), 0)
+                     for slug in slugs]
+        if not masks:
+            return 0
+        result = masks[0]
+        for mask in masks[1:]:
+            result = result & mask if mode == 'all' else result | mask
+        return result
+
+    def apply(self, action, title_ids, genre_ids, fresh):
+        """Применяет изменение api_title_genre, сделанное этим процессом.
+
+        title_ids или genre_ids None - все произведения или все жанры
+        (clear). fresh - был ли индекс актуален до изменения; только
+        тогда он актуален и после, иначе его перестроит ensure_fresh().
+        """
+        with self.lock:
+            if self.masks is None:
+                return
+            if genre_ids is None:
+                genre_ids = list(self.masks)
+            for genre_id in genre_ids:
+                mask = self.masks.get(genre_id, 0)
+                if title_ids is None:
+                    mask = 0
+                elif action == 'add':
+                    mask |= mask_of(title_ids)
+                else:
+                    mask &= ~mask_of(title_ids)
+                self.masks[genre_id] = mask
+            if fresh:
+                self.version = self.current_version()
+
+
+genre_index = GenreIndex()
+
+
+@AutoField.register_lookup
+class InIds(Lookup):
+    """pk__in_ids=[...]: как __in, но весь список - один параметр."""
+    lookup_name = 'in_ids'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        ids = [int(value) for value in self.rhs]
+        if connection.vendor == 'postgresql':
+            return (f'{lhs} = ANY(%s::integer[])',
+                    [*params, '{' + ','.join(map(str, ids)) + '}'])
+        return (f'{lhs} IN (SELECT value FROM json_each(%s))',
+                [*params, json.dumps(ids)])
+
+
+def filter_by_mask(queryset, mask):
+    """queryset, ограниченный произведениями из маски."""
+    return queryset.filter(pk__in_ids=ids_of(mask))
+
+
+def filter_by_genres(queryset, slugs, mode):
+    """?genre= через индекс в памяти или, если он выключен, через ORM."""
+    if not settings.GENRE_INDEX_ENABLED:
+        return filter_by_genres_orm(queryset, slugs, mode)
+    mask = genre_index.match(slugs, mode)
+    if count_of(mask) > settings.GENRE_INDEX_MAX_IDS:
+        return filter_by_genres_orm(queryset, slugs, mode)
+    return filter_by_mask(queryset, mask)
+
+
+def filter_by_genres_orm(queryset, slugs, mode):
+    through = Title.genre.through.objects
+    if mode == 'all':
+        for slug in slugs:
+            queryset = queryset.filter(pk__in=through.filter(
+                genre__slug=slug
+            ).values('title_id'))
+        return queryset
+    return queryset.filter(pk__in=through.filter(
+        genre__slug__in=slugs
+    ).values('title_id'))
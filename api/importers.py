@@ -0,0 +1,413 @@
+"""Потоковый импорт каталога из CSV и JSONL.
+
+Файл читается построчно, строки собираются в пачки по batch_size и
+пишутся одной транзакцией на пачку. После каждой пачки в checkpoint
+сохраняется байтовое смещение, с которого импорт можно продолжить.
+
+Строки, которые нельзя разобрать (битый JSON, не объект, комментарий
+без id при импорте с checkpoint), не пишутся и попадают в отчёт
+Importer.errors со смещением начала строки.
+"""
+import csv
+import io
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .caching import bump_version
+from .leaderboards import rebuild_leaderboards
+from .models import Category, Comment, Genre, Review, Title, User
+from .ratings import rebuild_ratings
+from .search import get_search_backend
+
+MODELS = {
+    'category': Category,
+    'genre': Genre,
+    'user': User,
+    'title': Title,
+    'genre_title': Title.genre.through,
+    'review': Review,
+    'comment': Comment,
+}
+# Поле, по которому связанную запись можно указать вместо id.
+NATURAL_KEYS = {Category: 'slug', Genre: 'slug', User: 'username'}
+# Повтор пачки после сбоя не создаёт дублей благодаря уникальным
+# ключам. У комментариев такой ключ только id, поэтому при импорте с
+# checkpoint он обязателен.
+REQUIRE_IDS = (Comment,)
+FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 100
+
+
+class UnknownReference(Exception):
+    pass
+
+
+class InvalidRow(Exception):
+    """Строка файла, которую нельзя превратить в словарь."""
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    return 'jsonl' if extension in ('.jsonl', '.ndjson') else 'csv'
+
+
+def _lines(handle, position):
+    for line in handle:
+        position[0] += len(line)
+        yield line.decode('utf-8')
+
+
+def _csv_rows(handle, lines, position, offset):
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header[0] = header[0].lstrip('\ufeff')
+    if offset > position[0]:
+        handle.seek(offset)
+        position[0] = offset
+    start = position[0]
+    for values in reader:
+        if values:
+            yield dict(zip(header, values)), start, position[0]
+        start = position[0]
+
+
+def _jsonl_rows(handle, lines, position, offset):
+    if offset:
+        handle.seek(offset)
+        position[0] = offset
+    start = position[0]
+    for line in lines:
+        if line.strip():
+            try:
+                row = json.loads(line.lstrip('\ufeff'))
+            except ValueError as error:
+                row = InvalidRow(f'не JSON: {error}')
+            if not isinstance(row, (dict, InvalidRow)):
+                row = InvalidRow('ожидался JSON-объект')
+            yield row, start, position[0]
+        start = position[0]
+
+
+def read_rows(path, file_format, offset=0):
+    """Строки файла со смещениями их начала и конца в байтах.
+
+    Строка - словарь или InvalidRow с причиной, по которой её не
+    удалось разобрать.
+    """
+    rows = _csv_rows if file_format == 'csv' else _jsonl_rows
+    with open(path, 'rb') as handle:
+        position = [0]
+        yield from rows(handle, _lines(handle, position), position, offset)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    # Пишем во временный файл и подменяем, чтобы падение посреди записи
+    # не оставило битый checkpoint.
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(state, handle)
+    os.replace(temporary, path)
+
+
+class Importer:
+    """Превращает строки файла в объекты модели и пишет их пачками.
+
+    Связанные категории, жанры и пользователи ищутся по словарям
+    slug/username -> id, загруженным один раз. Неизвестные ссылки
+    пропускают строку и считаются в skipped, неразобранные строки - в
+    invalid, первые MAX_REPORTED_ERRORS из них описаны в errors.
+    """
+
+    def __init__(self, model, using='default', use_copy=True,
+                 require_ids=False):
+        self.model = model
+        self.using = using
+        self.connection = connections[using]
+        self.use_copy = use_copy and self.connection.vendor == 'postgresql'
+        self.require_ids = require_ids
+        self.fields = {
+            field.name: field for field in model._meta.concrete_fields
+            if field.editable or field.primary_key
+            or getattr(field, 'auto_now_add', False)
+        }
+        self.key_maps = {}
+        self.imported = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.errors = []
+        self.explicit_ids = False
+
+    def check(self, row):
+        """Причина, по которой строку нельзя импортировать, или None."""
+        if isinstance(row, InvalidRow):
+            return str(row)
+        if self.require_ids and row.get('id') in ('', None):
+            return ('без id строка задвоится при повторе пачки, '
+                    'укажите id или импортируйте без checkpoint')
+        return None
+
+    def reject(self, offset, reason):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'byte {offset}: {reason}')
+
+    def key_map(self, model):
+        if model not in self.key_maps:
+            self.key_maps[model] = dict(
+                model.objects.using(self.using)
+                .values_list(NATURAL_KEYS[model], 'id')
+            )
+        return self.key_maps[model]
+
+    def resolve(self, model, value):
+        if isinstance(value, int) or str(value).isdigit():
+            return int(value)
+        if model not in NATURAL_KEYS:
+            raise UnknownReference(f'{model.__name__} {value}')
+        try:
+            return self.key_map(model)[value]
+        except KeyError:
+            raise UnknownReference(f'{model.__name__} {value}')
+
+    def field_for(self, key):
+        if key in self.fields:
+            return self.fields[key]
+        if key.endswith('_id') and key[:-3] in self.fields:
+            return self.fields[key[:-3]]
+        return None
+
+    def build(self, row):
+        """Объект модели и id жанров для Title.genre."""
+        genres = row.pop('genre', None) if self.model is Title else None
+        values = {}
+        for key, value in row.items():
+            field = self.field_for(key)
+            if field is None:
+                continue
+            if value in ('', None):
+                if field.null:
+                    values[field.attname] = None
+                continue
+            if field.is_relation:
+                value = self.resolve(field.related_model, value)
+            else:
+                value = field.to_python(value)
+            values[field.attname] = value
+        for field in self.model._meta.concrete_fields:
+            # Дату из файла сохраняем, auto_now_add заполняем сами только
+            # там, где её нет (см. insert).
+            if (getattr(field, 'auto_now_add', False)
+                    and values.get(field.attname) is None):
+                values[field.attname] = timezone.now()
+        if values.get('id') is not None:
+            self.explicit_ids = True
+        return self.model(**values), self.genre_ids(genres)
+
+    def genre_ids(self, genres):
+        if isinstance(genres, str):
+            genres = genres.split(',')
+        return [self.resolve(Genre, str(slug).strip())
+                for slug in genres or () if str(slug).strip()]
+
+    def write(self, rows):
+        """Пишет пачку строк файла одной транзакцией."""
+        objects, genres = [], []
+        for row in rows:
+            try:
+                obj, genre_ids = self.build(row)
+            except (UnknownReference, ValidationError, ValueError,
+                    TypeError):
+                self.skipped += 1
+                continue
+            objects.append(obj)
+            genres.append(genre_ids)
+        if not objects:
+            return
+        with transaction.atomic(using=self.using):
+            if self.use_copy and all(obj.pk for obj in objects):
+                self.copy(objects)
+            else:
+                self.bulk_create(objects, genres)
+            if any(genres):
+                self.add_genres(objects, genres)
+            self.after_batch(objects)
+        self.imported += len(objects)
+
+    def bulk_create(self, objects, genres):
+        manager = self.model.objects.using(self.using)
+        if any(genres) and not all(obj.pk for obj in objects):
+            # Чтобы связать жанры, нужны id новых строк: их возвращает
+            # только обычный INSERT без ignore_conflicts.
+            if not self.connection.features.can_return_ids_from_bulk_insert:
+                raise ValueError(
+                    'Для импорта жанров произведений укажите их id'
+                )
+            manager.bulk_create(objects)
+            return
+        self.insert(objects)
+
+    def insert(self, objects):
+        """INSERT ... ON CONFLICT DO NOTHING со значениями объектов как есть.
+
+        Вставка raw, как у loaddata: pre_save не вызывается, и
+        auto_now_add не заменяет даты из файла. Пропуск конфликтов делает
+        повтор пачки после сбоя безопасным.
+        """
+        queryset = self.model.objects.using(self.using)
+        for with_pk in (True, False):
+            group = [obj for obj in objects
+                     if (obj.pk is not None) == with_pk]
+            if not group:
+                continue
+            fields = [field for field in self.model._meta.local_concrete_fields
+                      if with_pk or not field.primary_key]
+            size = max(self.connection.ops.bulk_batch_size(fields, group), 1)
+            for start in range(0, len(group), size):
+                queryset._insert(group[start:start + size], fields,
+                                 raw=True, using=self.using,
+                                 ignore_conflicts=True)
+
+    def copy(self, objects):
+        """COPY во временную таблицу и INSERT ... ON CONFLICT DO NOTHING."""
+        meta = self.model._meta
+        fields = [field for field in meta.concrete_fields
+                  if field.column != 'search_vector']
+        table = self.connection.ops.quote_name(meta.db_table)
+        temporary = self.connection.ops.quote_name(f'import_{meta.db_table}')
+        columns = ', '.join(self.connection.ops.quote_name(field.column)
+                            for field in fields)
+        lines = []
+        for obj in objects:
+            lines.append(','.join(
+                self.copy_value(field.get_db_prep_save(
+                    getattr(obj, field.attname), self.connection
+                )) for field in fields
+            ))
+        data = '\n'.join(lines) + '\n'
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'CREATE TEMP TABLE {temporary} (LIKE {table})')
+            cursor.cursor.copy_expert(
+                f"COPY {temporary} ({columns}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '\\N')",
+                io.StringIO(data),
+            )
+            cursor.execute(f'INSERT INTO {table} ({columns}) '
+                           f'SELECT {columns} FROM {temporary} '
+                           f'ON CONFLICT DO NOTHING')
+            cursor.execute(f'DROP TABLE {temporary}')
+
+    @staticmethod
+    def copy_value(value):
+        if value is None:
+            return '\\N'
+        return '"{}"'.format(str(value).replace('"', '""'))
+
+    def add_genres(self, objects, genres):
+        through = Title.genre.through
+        through.objects.using(self.using).bulk_create(
+            [through(title_id=obj.pk, genre_id=genre_id)
+             for obj, genre_ids in zip(objects, genres)
+             for genre_id in genre_ids],
+            ignore_conflicts=True,
+        )
+
+    def after_batch(self, objects):
+        # bulk_create не шлёт сигналы: рейтинг, поисковые векторы и
+        # версии кеша обновляем сами для затронутых пачкой строк.
+        if self.model is Review:
+            title_ids = {obj.title_id for obj in objects}
+            rebuild_ratings(Title.objects.using(self.using)
+                            .filter(pk__in=title_ids))
+            for title_id in title_ids:
+                bump_version(f'review:title:{title_id}')
+        elif self.model is Comment:
+            for review_id in {obj.review_id for obj in objects}:
+                bump_version(f'comment:review:{review_id}')
+        elif self.model is Title:
+            titles = Title.objects.using(self.using)
+            ids = [obj.pk for obj in objects if obj.pk]
+            if ids:
+                # Ревью могли импортировать раньше произведений.
+                titles = titles.filter(pk__in=ids)
+                rebuild_ratings(titles)
+            else:
+                titles = titles.filter(search_vector__isnull=True)
+            get_search_backend(self.using).update_vectors(titles)
+
+    def finish(self):
+        """Версии кеша и последовательности id после всего импорта."""
+        model = (Title if self.model is Title.genre.through
+                 else self.model)
+        if model in (Genre, Category, Title, Review):
+            bump_version(model._meta.model_name)
+        if model in (Genre, Title):
+            bump_version('title_genre')
+        if model in (Title, Review):
+            # Пачки пишутся без сигналов, поэтому рейтинги собираем
+            # заново один раз на весь импорт.
+            rebuild_leaderboards(self.using)
+        if self.explicit_ids:
+            statements = self.connection.ops.sequence_reset_sql(
+                no_style(), [self.model]
+            )
+            with self.connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+
+def import_file(path, model_name, file_format=None, batch_size=5000,
+                checkpoint=None, resume=False, use_copy=True,
+                using='default', progress=None):
+    """Импортирует файл и возвращает Importer со счётчиками."""
+    file_format = file_format or detect_format(path)
+    model = MODELS[model_name]
+    importer = Importer(model, using=using, use_copy=use_copy,
+                        require_ids=bool(checkpoint)
+                        and model in REQUIRE_IDS)
+    offset, done = 0, 0
+    state = load_checkpoint(checkpoint) if checkpoint and resume else None
+    if state:
+        if state['model'] != model_name or state['path'] != path:
+            raise ValueError(f'Checkpoint {checkpoint} от другого импорта')
+        offset, done = state['offset'], state['rows']
+        importer.explicit_ids = state.get('explicit_ids', False)
+    batch = []
+    for row, start, end in read_rows(path, file_format, offset):
+        done += 1
+        error = importer.check(row)
+        if error:
+            importer.reject(start, error)
+        else:
+            batch.append(row)
+        if len(batch) < batch_size:
+            continue
+        importer.write(batch)
+        batch = []
+        if checkpoint:
+            save_checkpoint(checkpoint, {
+                'model': model_name, 'path': path, 'offset': end,
+                'rows': done, 'explicit_ids': importer.explicit_ids,
+            })
+        if progress:
+            progress(done, importer)
+    if batch:
+        importer.write(batch)
+    importer.finish()
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return importer
@@ -0,0 +1,135 @@
+"""Рейтинги лучших произведений: общий, по жанру, категории и году.
+
+Места хранятся в таблице TitleRanking, по строке на пару (доска,
+произведение), под индексом (board, -score, title): топ-N любой доски -
+чтение первых N записей индекса, без агрегатов и сортировки.
+
+Оценка - байесовское среднее (rating_sum + m * C) / (rating_count + m),
+где m - LEADERBOARD_PRIOR_VOTES, C - LEADERBOARD_PRIOR_MEAN. Пока оценок
+мало, оно близко к C, поэтому единственная десятка не выводит
+произведение на первое место. C задан настройкой, а не средним по базе:
+тогда оценка произведения зависит только от его ревью и строки можно
+пересчитывать по одному произведению.
+
+Сигналы api.signals пересчитывают строки произведения, когда меняются
+его ревью, жанры, категория или год. rebuild_leaderboards собирает всю
+таблицу заново четырьмя INSERT ... SELECT, по одному на вид доски.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .caching import bump_version
+from .models import Title, TitleRanking
+
+ALL = 'all'
+
+
+def board_name(kind, value=None):
+    """Ключ доски: all, genre:<id>, category:<id>, year:<год>."""
+    if kind == ALL:
+        return ALL
+    return f'{kind}:{value}'
+
+
+def _boards(quote):
+    """(ключ доски, JOIN, условие) для каждого вида доски."""
+    title = Title._meta
+    through = Title.genre.through._meta
+    category = quote(title.get_field('category').column)
+    year = quote(title.get_field('year').column)
+    return [
+        (f"'{ALL}'", '', ''),
+        (f"'category:' || CAST(t.{category} AS VARCHAR(20))", '',
+         f'AND t.{category} IS NOT NULL'),
+        (f"'year:' || CAST(t.{year} AS VARCHAR(20))", '',
+         f'AND t.{year} IS NOT NULL'),
+        ("'genre:' || CAST(g.{} AS VARCHAR(20))".format(
+            quote(through.get_field('genre').column)),
+         'JOIN {} g ON g.{} = t.{}'.format(
+             quote(through.db_table),
+             quote(through.get_field('title').column),
+             quote(title.pk.column)),
+         ''),
+    ]
+
+
+def _insert_rankings(connection, title_ids=None):
+    quote = connection.ops.quote_name
+    ranking = TitleRanking._meta
+    title = Title._meta
+    pk = quote(title.pk.column)
+    rating_sum = quote(title.get_field('rating_sum').column)
+    rating_count = quote(title.get_field('rating_count').column)
+    board_column, title_column, score, votes = (
+        quote(ranking.get_field(name).column)
+        for name in ('board', 'title', 'score', 'votes')
+    )
+    columns = f'{board_column}, {title_column}, {score}, {votes}'
+    # Строку, вставленную параллельным пересчётом, обновляем, а не
+    # падаем на unique_ranking_title.
+    upsert = (f'ON CONFLICT ({board_column}, {title_column}) DO UPDATE '
+              f'SET {score} = excluded.{score}, '
+              f'{votes} = excluded.{votes}')
+    weight = float(settings.LEADERBOARD_PRIOR_VOTES)
+    prior = weight * settings.LEADERBOARD_PRIOR_MEAN
+    only = ''
+    if title_ids is not None:
+        only = 'AND t.{} IN ({})'.format(
+            pk, ', '.join(['%s'] * len(title_ids))
+        )
+    inserted = 0
+    with connection.cursor() as cursor:
+        for board, join, condition in _boards(quote):
+            cursor.execute(
+                f'INSERT INTO {quote(ranking.db_table)} ({columns}) '
+                f'SELECT {board}, t.{pk}, '
+                f'(t.{rating_sum} + %s) * 1.0 / (t.{rating_count} + %s), '
+                f't.{rating_count} '
+                f'FROM {quote(title.db_table)} t {join} '
+                f'WHERE t.{rating_count} > 0 {condition} {only} {upsert}',
+                [prior, weight, *(title_ids or ())]
+            )
+            inserted += cursor.rowcount
+    return inserted
+
+
+def refresh_rankings(title_ids, using=DEFAULT_DB_ALIAS):
+    """Пересчитывает строки рейтинга произведений title_ids.
+
+    Строки произведений блокируются на время пересчёта: параллельные
+    правки ревью одного произведения пересчитывают его по очереди.
+    SQLite FOR UPDATE не поддерживает, но и пишет по одной транзакции.
+    """
+    title_ids = sorted(set(title_ids))
+    if not title_ids:
+        return
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.features.has_select_for_update:
+            list(Title.objects.using(using).select_for_update()
+                 .filter(pk__in=title_ids).order_by('pk')
+                 .values_list('pk', flat=True))
+        TitleRanking.objects.using(using).filter(
+            title_id__in=title_ids
+        ).delete()
+        _insert_rankings(connection, title_ids)
+    bump_version('ranking')
+
+
+def rebuild_leaderboards(using=DEFAULT_DB_ALIAS):
+    """Собирает таблицу рейтинга заново, возвращает число строк."""
+    with transaction.atomic(using=using):
+        TitleRanking.objects.using(using).all().delete()
+        inserted = _insert_rankings(connections[using])
+    bump_version('ranking')
+    return inserted
+
+
+def top_titles(board, limit):
+    return (
+        TitleRanking.objects.filter(board=board)
+        .select_related('title__category')
+        .prefetch_related('title__genre')
+        .defer('title__search_vector')
+        .order_by('-score', 'title_id')[:limit]
+    )
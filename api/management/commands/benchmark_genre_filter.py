@@ -0,0 +1,120 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.caching import bump_version
+from api.genre_index import (VERSION, count_of, filter_by_genres_orm,
+                             filter_by_mask, genre_index)
+from api.models import Genre, Title
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает фильтр ?genre=a,b через ORM и через индекс жанров '
+            'в памяти на синтетическом каталоге. Данные откатываются '
+            'после замера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=50000)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--queries', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            slugs = self.populate(rng, options['titles'], options['genres'],
+                                  options['batch_size'])
+            started = time.perf_counter()
+            genre_index.build()
+            build = (time.perf_counter() - started) * 1000
+            samples = [rng.sample(slugs, 2) for _ in range(options['queries'])]
+            results, sizes = self.measure(samples)
+            transaction.set_rollback(True)
+        # Индекс собран по откаченным данным.
+        bump_version(VERSION)
+        self.stdout.write(
+            f'{options["titles"]} titles, {options["genres"]} genres, '
+            f'{options["queries"]} queries, {connection.vendor}'
+        )
+        self.stdout.write(f'{"index build":<28} {build:8.2f} ms')
+        for mode, timings in results.items():
+            timings = sorted(timings)
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f'{mode:<28} median {statistics.median(timings):8.2f} ms'
+                f'   p95 {p95:8.2f} ms'
+            )
+        # index (...) - всегда список id; в API выше лимита вместо него
+        # выполняется orm (...).
+        limit = settings.GENRE_INDEX_MAX_IDS
+        for mode, counts in sizes.items():
+            above = sum(count > limit for count in counts)
+            self.stdout.write(
+                f'{f"ids ({mode})":<28} median '
+                f'{statistics.median(counts):8.0f}   above '
+                f'GENRE_INDEX_MAX_IDS={limit}: {above} of {len(counts)}'
+            )
+
+    def populate(self, rng, count, genre_count, batch_size):
+        Genre.objects.bulk_create([
+            Genre(name=f'Benchmark genre {number}',
+                  slug=f'benchmark-genre-{number}')
+            for number in range(genre_count)
+        ])
+        genres = dict(Genre.objects.filter(
+            slug__startswith='benchmark-genre-'
+        ).values_list('slug', 'id'))
+        batch = []
+        for number in range(count):
+            batch.append(Title(name=f'Benchmark title {number}'))
+            if len(batch) >= batch_size:
+                Title.objects.bulk_create(batch)
+                batch = []
+        Title.objects.bulk_create(batch)
+        through = Title.genre.through
+        genre_ids = list(genres.values())
+        batch = []
+        titles = Title.objects.filter(name__startswith='Benchmark title ')
+        for title_id in titles.values_list('id', flat=True).iterator():
+            for genre_id in rng.sample(genre_ids, rng.randint(1, 4)):
+                batch.append(through(title_id=title_id, genre_id=genre_id))
+            if len(batch) >= batch_size:
+                through.objects.bulk_create(batch)
+                batch = []
+        through.objects.bulk_create(batch)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_title')
+                cursor.execute('ANALYZE api_title_genre')
+        return list(genres)
+
+    def timed(self, build_queryset):
+        # Как при запросе страницы списка: COUNT и первые 10 строк.
+        started = time.perf_counter()
+        queryset = build_queryset().order_by('-id')
+        queryset.count()
+        list(queryset[:10])
+        return (time.perf_counter() - started) * 1000
+
+    def measure(self, samples):
+        results, sizes = {}, {}
+        for mode in ('any', 'all'):
+            results[f'orm ({mode})'] = []
+            results[f'index ({mode})'] = []
+            sizes[mode] = [count_of(genre_index.match(slugs, mode))
+                           for slugs in samples]
+            for slugs in samples:
+                results[f'orm ({mode})'].append(self.timed(
+                    lambda: filter_by_genres_orm(Title.objects.all(),
+                                                 slugs, mode)
+                ))
+                results[f'index ({mode})'].append(self.timed(
+                    lambda: filter_by_mask(Title.objects.all(),
+                                           genre_index.match(slugs, mode))
+                ))
+        return results, sizes
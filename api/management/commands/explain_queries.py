@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.explain import check_endpoints, seed
+
+
+class Command(BaseCommand):
+    help = ('Проверяет EXPLAIN запросов эндпоинтов на засеянных данных: '
+            'полный просмотр таблицы или сортировка - ошибка. Данные '
+            'откатываются после проверки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=200)
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Печатать запросы и планы всех эндпоинтов')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            values = seed(titles=options['titles'])
+            results = check_endpoints(values)
+            transaction.set_rollback(True)
+        failed = 0
+        for name, (path, status, queries) in results.items():
+            problems = [problem for *_, plan_problems in queries
+                        for problem in plan_problems]
+            ok = status == 200 and not problems
+            failed += not ok
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(
+                f'{"OK" if ok else "FAIL":<5}{name:<24} {path} '
+                f'[{status}, {len(queries)} SQL]'
+            ))
+            if ok and not options['verbose_plans']:
+                continue
+            for sql, params, lines, plan_problems in queries:
+                if not plan_problems and not options['verbose_plans']:
+                    continue
+                self.stdout.write(f'    {sql}')
+                self.stdout.write(f'    params: {params}')
+                for line in lines:
+                    self.stdout.write(f'      {line}')
+        if failed:
+            raise CommandError(f'Проблемные планы у {failed} эндпоинтов')
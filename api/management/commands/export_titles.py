@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.export import export_titles
+
+
+class Command(BaseCommand):
+    help = 'Выгружает произведения с жанрами, категорией и рейтингом в NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o',
+                            help='Файл для выгрузки, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int,
+                            default=settings.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = export_titles(chunk_size=options['chunk_size'])
+        if not options['output']:
+            for lines in chunks:
+                self.stdout.write(lines, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            for lines in chunks:
+                stream.write(lines)
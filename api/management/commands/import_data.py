@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import FORMATS, MODELS, import_file
+
+
+class Command(BaseCommand):
+    help = 'Потоковый импорт модели из CSV или JSONL пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=list(MODELS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='По умолчанию по расширению файла')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.IMPORT_BATCH_SIZE)
+        parser.add_argument('--checkpoint',
+                            help='Файл прогресса, по умолчанию '
+                                 '<path>.checkpoint')
+        parser.add_argument('--no-checkpoint', action='store_true',
+                            help='Не сохранять прогресс: без --resume, '
+                                 'зато комментарии можно без id')
+        parser.add_argument('--resume', action='store_true',
+                            help='Продолжить с места, записанного '
+                                 'в checkpoint')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Не использовать COPY на PostgreSQL')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        checkpoint = None
+        if not options['no_checkpoint']:
+            checkpoint = (options['checkpoint']
+                          or f'{options["path"]}.checkpoint')
+        try:
+            importer = import_file(
+                options['path'], options['model'],
+                file_format=options['format'],
+                batch_size=options['batch_size'],
+                checkpoint=checkpoint,
+                resume=options['resume'],
+                use_copy=not options['no_copy'],
+                progress=self.progress,
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        for error in importer.errors:
+            self.stderr.write(f'invalid row at {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["model"]}: imported={importer.imported} '
+            f'skipped={importer.skipped} invalid={importer.invalid}'
+        ))
+
+    def progress(self, rows, importer):
+        if self.verbosity > 1:
+            self.stdout.write(f'rows={rows} imported={importer.imported} '
+                              f'skipped={importer.skipped}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Собирает заново таблицу рейтингов произведений'
+
+    def handle(self, *args, **options):
+        inserted = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано {inserted} мест в рейтингах'
+        ))
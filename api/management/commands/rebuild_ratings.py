@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ratings import find_rating_mismatches, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённый рейтинг произведений по ревью'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить рейтинг, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = find_rating_mismatches()
+        if options['check']:
+            broken = list(mismatches.values_list(
+                'id', 'rating_sum', 'rating_count',
+                'actual_sum', 'actual_count'
+            ))
+            for row in broken:
+                self.stdout.write(
+                    'Title {}: stored {}/{}, actual {}/{}'.format(*row)
+                )
+            if broken:
+                raise CommandError(
+                    f'Рейтинг расходится у {len(broken)} произведений'
+                )
+            self.stdout.write(self.style.SUCCESS('Рейтинг в порядке'))
+            return
+        updated = rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитан рейтинг {updated} произведений'
+        ))
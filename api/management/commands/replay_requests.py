@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.replay import Replayer, load_records, tokens_for_roles
+
+
+class Command(BaseCommand):
+    help = ('Воспроизводит журнал запросов (JSONL) против WSGI-приложения '
+            'и считает задержки и SQL-запросы по шаблонам URL')
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', help='JSONL с method, path, body, role')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='Сколько раз прогнать журнал')
+        parser.add_argument('--output', '-o',
+                            help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        # Импорт здесь: модуль wsgi сам настраивает Django.
+        from api_yamdb.wsgi import application
+
+        records, skipped = load_records(options['log'])
+        if not records:
+            raise CommandError(
+                f'В {options["log"]} нет записей с method и path'
+            )
+        roles = {record['role'] for record in records if record.get('role')}
+        try:
+            tokens = tokens_for_roles(roles)
+        except ValueError as error:
+            raise CommandError(error)
+        replayer = Replayer(application, tokens, options['concurrency'])
+        result = replayer.run(records * options['repeat'])
+        result['skipped'] = skipped
+        self.write_report(result)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(result, handle, indent=2)
+
+    def write_report(self, result):
+        self.stdout.write(
+            f'{result["requests"]} requests in {result["duration_s"]:.2f}s, '
+            f'{result["throughput"]:.1f} req/s, '
+            f'concurrency={result["concurrency"]}, '
+            f'skipped={result["skipped"]}'
+        )
+        self.stdout.write(f'{"route":60} {"n":>6} {"p50":>8} {"p95":>8} '
+                          f'{"p99":>8} {"sql":>6}')
+        for route, stats in result['routes'].items():
+            self.stdout.write(
+                f'{route:60} {stats["requests"]:>6} '
+                f'{stats["p50_ms"]:>8.1f} {stats["p95_ms"]:>8.1f} '
+                f'{stats["p99_ms"]:>8.1f} {stats["queries_mean"]:>6.1f}'
+            )
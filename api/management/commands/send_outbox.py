@@ -0,0 +1,61 @@
+import logging
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.outbox import queue_depth, send_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди писем: отправляет OutboxEmail пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Отправить одну пачку и выйти')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать глубину очереди и выйти')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float,
+                            default=settings.OUTBOX_POLL_INTERVAL,
+                            help='Пауза в секундах, когда очередь пуста')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.write_depth()
+            return
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while self.running:
+            try:
+                sent, failed = send_batch(options['batch_size'])
+            except Exception:
+                # Например, БД недоступна: воркер не падает, а ждёт и
+                # пробует снова.
+                if options['once']:
+                    raise
+                logger.exception('Ошибка отправки пачки писем')
+                time.sleep(options['interval'])
+                continue
+            if sent or failed:
+                self.stdout.write(f'sent={sent} failed={failed}')
+                self.write_depth()
+            if options['once']:
+                break
+            if not sent and not failed:
+                time.sleep(options['interval'])
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def write_depth(self):
+        depth = queue_depth()
+        self.stdout.write(
+            'outbox pending={pending} due={due} failed={failed}'
+            .format(**depth)
+        )
@@ -0,0 +1,310 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+Каждый процесс gunicorn копит счётчики в памяти и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сбрасывает их в METRICS_DIR/<pid>.json.
+/metrics складывает файлы всех процессов, поэтому сумма верна, какой бы
+воркер ни ответил на запрос.
+
+Когда воркер завершается, мастер gunicorn (child_exit) переносит его
+счётчики и гистограммы в METRICS_DIR/archive.json и удаляет его файл:
+счётчики остаются в сумме, а gauge умершего процесса - нет. Gauge
+складываются только по файлам живых процессов, на случай воркера,
+убитого без child_exit. Новый процесс с тем же pid перед первой записью
+сам переносит оставшийся файл в архив.
+"""
+import atexit
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from api_yamdb.backends import pool
+
+from .authentication import user_cache
+
+GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+METRICS = {
+    'yamdb_http_requests_total': (
+        'counter', 'Запросы по маршруту, методу и статусу'),
+    'yamdb_http_request_duration_seconds': (
+        'histogram', 'Время ответа'),
+    'yamdb_http_response_size_bytes': (
+        'histogram', 'Размер тела ответа'),
+    'yamdb_db_queries_total': (
+        'counter', 'SQL-запросы, выполненные при обработке запросов'),
+    'yamdb_db_query_seconds_total': (
+        'counter', 'Время SQL-запросов'),
+    'yamdb_auth_user_cache_total': (
+        'counter', 'Обращения к кешу пользователей по результату'),
+    'yamdb_auth_user_cache_size': (
+        'gauge', 'Пользователей в кешах всех процессов'),
+    'yamdb_db_pool_events_total': (
+        'counter', 'События пулов соединений с БД'),
+    'yamdb_db_pool_wait_seconds_total': (
+        'counter', 'Ожидание свободного соединения в пуле'),
+    'yamdb_db_pool_connections': (
+        'gauge', 'Соединения пулов: свободные и выданные'),
+}
+
+
+def normalize_route(route):
+    """api/v1/^titles/(?P<title_id>\\d+)/$ -> api/v1/titles/{title_id}/."""
+    return GROUP.sub(r'{\1}', route).replace('^', '').replace('$', '')
+
+
+def execute_wrapper(wrapper):
+    """connection.execute_wrapper сразу для всех алиасов БД.
+
+    Чтение с реплики идёт через её соединение, а не через default.
+    """
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+    return stack
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return normalize_route(match.route)
+
+
+ARCHIVE = 'archive'
+
+
+def _is_gauge(name):
+    return METRICS.get(name, ('counter', ))[0] == 'gauge'
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(temporary, path)
+
+
+def _merge(counters, histograms, data, gauges=True):
+    for name, labels, value in data['counters']:
+        if not gauges and _is_gauge(name):
+            continue
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, histogram in data['histograms']:
+        key = (name, tuple(sorted(labels.items())))
+        total = histograms.setdefault(key, {
+            'buckets': histogram['buckets'],
+            'counts': [0] * len(histogram['buckets']),
+            'sum': 0, 'count': 0,
+        })
+        for index, count in enumerate(histogram['counts']):
+            total['counts'][index] += count
+        total['sum'] += histogram['sum']
+        total['count'] += histogram['count']
+
+
+def archive_worker(pid):
+    """Переносит метрики процесса pid в архив, без gauge."""
+    directory = settings.METRICS_DIR
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    archive = os.path.join(directory, f'{ARCHIVE}.json')
+    with open(os.path.join(directory, f'{ARCHIVE}.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = _read(path)
+        if data is not None:
+            counters, histograms = {}, {}
+            for source in (_read(archive), data):
+                if source is not None:
+                    _merge(counters, histograms, source, gauges=False)
+            _write(archive, {
+                'counters': [[name, dict(labels), value]
+                             for (name, labels), value in counters.items()],
+                'histograms': [[name, dict(labels), histogram]
+                               for (name, labels), histogram
+                               in histograms.items()],
+            })
+        os.remove(path)
+
+
+class MetricsStore:
+    """Счётчики и гистограммы одного процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = 0.0
+        self.pid = None
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * len(buckets), 'sum': 0, 'count': 0,
+                }
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            counters = [[name, dict(labels), value]
+                        for (name, labels), value in self.counters.items()]
+            histograms = [
+                [name, dict(labels),
+                 {**histogram, 'counts': list(histogram['counts'])}]
+                for (name, labels), histogram in self.histograms.items()
+            ]
+        stats = user_cache.stats()
+        for result in ('hits', 'misses', 'evictions', 'invalidations'):
+            counters.append(['yamdb_auth_user_cache_total',
+                             {'result': result}, stats[result]])
+        counters.append(['yamdb_auth_user_cache_size', {}, stats['size']])
+        for alias, stats in pool.all_stats().items():
+            for event in pool.COUNTERS:
+                counters.append(['yamdb_db_pool_events_total',
+                                 {'alias': alias, 'event': event},
+                                 stats[event]])
+            counters.append(['yamdb_db_pool_wait_seconds_total',
+                             {'alias': alias}, stats['wait_seconds']])
+            for state in ('idle', 'in_use'):
+                counters.append(['yamdb_db_pool_connections',
+                                 {'alias': alias, 'state': state},
+                                 stats[state]])
+        return {'counters': counters, 'histograms': histograms}
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not force and now - self.flushed_at < interval:
+            return
+        self.flushed_at = now
+        directory = settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        if self.pid != os.getpid():
+            # Файл с нашим pid остался от умершего процесса.
+            archive_worker(os.getpid())
+            self.pid = os.getpid()
+        _write(os.path.join(directory, f'{os.getpid()}.json'),
+               self.snapshot())
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+store = MetricsStore()
+atexit.register(lambda: store.flush(force=True))
+
+
+def record_request(route, method, status, duration, size, queries,
+                   query_time):
+    labels = {'route': route, 'method': method}
+    store.inc('yamdb_http_requests_total', dict(labels, status=str(status)))
+    store.observe('yamdb_http_request_duration_seconds', labels, duration,
+                  LATENCY_BUCKETS)
+    if size is not None:
+        store.observe('yamdb_http_response_size_bytes', labels, size,
+                      SIZE_BUCKETS)
+    store.inc('yamdb_db_queries_total', labels, queries)
+    store.inc('yamdb_db_query_seconds_total', labels, query_time)
+    store.flush()
+
+
+def collect():
+    """Сумма метрик всех процессов из METRICS_DIR."""
+    store.flush(force=True)
+    counters, histograms = {}, {}
+    directory = settings.METRICS_DIR
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        data = _read(os.path.join(directory, filename))
+        if data is None:
+            continue
+        name = filename[:-len('.json')]
+        alive = name.isdigit() and _is_alive(int(name))
+        _merge(counters, histograms, data, gauges=alive)
+    return counters, histograms
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    ) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render():
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(histogram['buckets'],
+                                    histogram['counts']):
+                lines.append(f'{name}_bucket'
+                             f'{_labels(labels, le=_number(bound))} {count}')
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} '
+                         f'{histogram["count"]}')
+            lines.append(f'{name}_sum{_labels(labels)} '
+                         f'{_number(histogram["sum"])}')
+            lines.append(f'{name}_count{_labels(labels)} '
+                         f'{histogram["count"]}')
+    return '\n'.join(lines) + '\n'
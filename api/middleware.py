@@ -0,0 +1,39 @@
+import time
+
+from .metrics import execute_wrapper, record_request, route_name
+from .warmup import WARMUP_ENVIRON_KEY
+
+
+class MetricsMiddleware:
+    """Считает запросы, время ответа, размер тела и SQL по маршрутам.
+
+    Стоит первым в MIDDLEWARE, чтобы время включало остальные middleware.
+    У потоковых ответов время - до первого байта, размер не считается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.META.get(WARMUP_ENVIRON_KEY):
+            return self.get_response(request)
+        queries = {'count': 0, 'time': 0.0}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries['count'] += 1
+                queries['time'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with execute_wrapper(count_query):
+            response = self.get_response(request)
+        record_request(
+            route_name(request), request.method, response.status_code,
+            time.perf_counter() - started,
+            None if response.streaming else len(response.content),
+            queries['count'], queries['time'],
+        )
+        return response
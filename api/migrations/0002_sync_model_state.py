@@ -0,0 +1,158 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:37
+
+import api.models
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django_utils.choices
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='genretitle',
+            name='genre_id',
+        ),
+        migrations.RemoveField(
+            model_name='genretitle',
+            name='title_id',
+        ),
+        migrations.AlterModelOptions(
+            name='category',
+            options={'ordering': ['-id'], 'verbose_name': 'Категория', 'verbose_name_plural': 'Категории'},
+        ),
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['-id', 'pub_date'], 'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='genre',
+            options={'ordering': ['-id'], 'verbose_name': 'Жанр', 'verbose_name_plural': 'Жанры'},
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-id'], 'verbose_name': 'Ревью', 'verbose_name_plural': 'Ревью'},
+        ),
+        migrations.AlterModelOptions(
+            name='title',
+            options={'ordering': ['-id'], 'verbose_name': 'Произведение', 'verbose_name_plural': 'Произведения'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'ordering': ['-id'], 'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=50, verbose_name='Название'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(unique=True, verbose_name='Slug'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='author',
+            field=models.ForeignKey(db_column='author', on_delete=django.db.models.deletion.CASCADE, related_name='comments', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='api.Review', verbose_name='Отзыв'),
+        ),
+        migrations.AlterField(
+            model_name='genre',
+            name='name',
+            field=models.CharField(max_length=50, verbose_name='Название'),
+        ),
+        migrations.AlterField(
+            model_name='genre',
+            name='slug',
+            field=models.SlugField(unique=True, verbose_name='Slug'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='score',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(0, message='Убедитесь, что это значение больше или равно 0'), django.core.validators.MaxValueValidator(11, message='Убедитесь, что это значение меньше или равно 10')], verbose_name='Рейтинг'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='category',
+            field=models.ForeignKey(db_column='category', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='titles', to='api.Category', verbose_name='Категория'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='description',
+            field=models.TextField(null=True, verbose_name='Описание'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='genre',
+            field=models.ManyToManyField(to='api.Genre', verbose_name='Жанр'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='name',
+            field=models.CharField(max_length=50, verbose_name='Название'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.IntegerField(null=True, validators=[api.models.my_year_validator], verbose_name='Год выпуска'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='bio',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Информация о пользователе'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True, verbose_name='Электронная почта'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='password',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Пароль пользователя'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('user', django_utils.choices.Choice('user', 'user')), ('moderator', django_utils.choices.Choice('moderator', 'moderator')), ('admin', django_utils.choices.Choice('admin', 'admin'))], default='user', max_length=10, verbose_name='Роль пользователя'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='username',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name='Имя пользователя'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('name',), name='unique_category_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('slug',), name='unique_category_slug'),
+        ),
+        migrations.AddConstraint(
+            model_name='genre',
+            constraint=models.UniqueConstraint(fields=('name',), name='unique_genre_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='genre',
+            constraint=models.UniqueConstraint(fields=('slug',), name='unique_genre_slug'),
+        ),
+        migrations.AddConstraint(
+            model_name='title',
+            constraint=models.UniqueConstraint(fields=('name',), name='unique_title_name'),
+        ),
+        migrations.DeleteModel(
+            name='GenreTitle',
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:40
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN-индекс и tsvector есть только в PostgreSQL, на SQLite поле
+    # остаётся пустым и поиск идёт через SimpleTitleSearchBackend.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS api_title_search_vector_gin '
+        'ON api_title USING gin (search_vector)'
+    )
+    Title = apps.get_model('api', 'Title')
+    config = settings.TITLE_SEARCH_CONFIG
+    Title.objects.update(search_vector=(
+        django.contrib.postgres.search.SearchVector(
+            'name', weight='A', config=config)
+        + django.contrib.postgres.search.SearchVector(
+            'description', weight='B', config=config)
+    ))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS api_title_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_title_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+TRIGRAM_TABLES = ('api_title', 'api_genre', 'api_category')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Индекс по UPPER(name) обслуживает и icontains, который Django
+    # строит как UPPER(name) LIKE UPPER(%s), и нечёткий оператор %.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in TRIGRAM_TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_name_upper_trgm '
+            f'ON {table} USING gin (UPPER(name) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TRIGRAM_TABLES:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {table}_name_upper_trgm'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_title_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:50
+
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_reviews(apps, schema_editor):
+    # Повторные ревью не удаляем: вместе с ними каскадом ушли бы
+    # комментарии. Миграция останавливается со списком пар, которые
+    # нужно разобрать вручную.
+    Review = apps.get_model('api', 'Review')
+    duplicates = (Review.objects.order_by('title', 'author')
+                  .values('title', 'author')
+                  .annotate(total=Count('id')).filter(total__gt=1))
+    conflicts = []
+    for row in duplicates:
+        ids = Review.objects.filter(
+            title_id=row['title'], author_id=row['author'],
+        ).order_by('id').values_list('id', flat=True)
+        conflicts.append(
+            f"title={row['title']} author={row['author']} "
+            f"reviews={', '.join(map(str, ids))}"
+        )
+    if conflicts:
+        raise CommandError(
+            'У автора несколько ревью на одно произведение, оставьте по '
+            'одному и повторите migrate:\n' + '\n'.join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_confirmation_code'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_reviews,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('title', 'author'), name='unique_review_author'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.6 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_title_ranking'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['-id'], 'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='titleranking',
+            options={'ordering': ['board', '-score', 'title_id'], 'verbose_name': 'Место в рейтинге', 'verbose_name_plural': 'Рейтинги произведений'},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', '-id'], name='comment_review_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', '-id'], name='review_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', '-id'], name='title_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-id'], name='title_category_id_idx'),
+        ),
+        # Промежуточная таблица жанров создаётся Django без модели, поэтому
+        # индекс под ?genre= (жанр, затем произведения по -id) - SQL.
+        migrations.RunSQL(
+            'CREATE INDEX title_genre_genre_title_idx '
+            'ON api_title_genre (genre_id, title_id DESC)',
+            'DROP INDEX title_genre_genre_title_idx',
+        ),
+    ]
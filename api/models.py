@@ -1,9 +1,11 @@
 import datetime as dt
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_utils.choices import Choice, Choices
 from rest_framework_simplejwt.tokens import AccessToken
@@ -15,6 +17,12 @@ class RoleChoices(Choices):
     ADMIN = Choice('admin', _('admin'))
 
 
+class OutboxStatusChoices(Choices):
+    PENDING = Choice('pending', _('pending'))
+    SENT = Choice('sent', _('sent'))
+    FAILED = Choice('failed', _('failed'))
+
+
 # Вот ради одной функции точно не буду новый файл создавать
 def my_year_validator(value):
     if value > dt.datetime.now().year:
@@ -97,7 +105,16 @@ class User(AbstractUser):
         return self.email
 
     def _generate_jwt_token(self):
-        return AccessToken.for_user(self)
+        token = AccessToken.for_user(self)
+        # Нужны CachedJWTAuthentication в режиме AUTH_STATELESS_TOKENS.
+        token['username'] = self.username
+        token['email'] = self.email
+        token['role'] = self.role
+        return token
+
+    @property
+    def token(self):
+        return str(self._generate_jwt_token())
 
     @property
     def role_is_user(self):
@@ -112,6 +129,31 @@ class User(AbstractUser):
         return self.role == RoleChoices.ADMIN
 
 
+class ConfirmationCode(models.Model):
+    """Одноразовый код для получения токена, хранится только HMAC."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='confirmation_code',
+        verbose_name='Пользователь'
+    )
+    code_hash = models.CharField(max_length=64, verbose_name='HMAC кода')
+    expires_at = models.DateTimeField(verbose_name='Действует до')
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток ввода'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания'
+    )
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.expires_at}'
+
+
 class Genre(models.Model):
     name = models.CharField(max_length=50, verbose_name='Название')
     slug = models.SlugField(max_length=50, unique=True, verbose_name='Slug')
@@ -154,6 +196,9 @@ class Category(models.Model):
         return self.name
 
 
+RATING_COUNTER_FIELDS = ('rating_sum', 'rating_count')
+
+
 class Title(models.Model):
     name = models.CharField(max_length=50, verbose_name='Название')
     year = models.IntegerField(null=True, verbose_name='Год выпуска',
@@ -168,6 +213,18 @@ class Title(models.Model):
         verbose_name='Категория'
     )
     genre = models.ManyToManyField(Genre, verbose_name='Жанр')
+    # Сумма и количество оценок поддерживаются сигналами api.signals,
+    # чтобы не пересчитывать Avg по всем ревью на каждый запрос.
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Сумма оценок'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество оценок'
+    )
+    # Заполняется поисковым бэкендом api.search при сохранении.
+    search_vector = SearchVectorField(
+        null=True, editable=False, verbose_name='Поисковый вектор'
+    )
 
     class Meta:
         ordering = ['-id', ]
@@ -178,10 +235,39 @@ class Title(models.Model):
                 fields=['name'], name='unique_title_name'
             )
         ]
+        # Фильтры ?year= и ?category= списка, упорядоченного по -id.
+        # Индекс (genre_id, title_id) для ?genre= создан в миграции 0010:
+        # промежуточная таблица жанров не описана моделью.
+        indexes = [
+            models.Index(fields=['year', '-id'], name='title_year_id_idx'),
+            models.Index(fields=['category', '-id'],
+                         name='title_category_id_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Счётчики оценок меняются только через update() с F() в
+        # api.ratings: сохранение объекта, загруженного до нового ревью,
+        # иначе затёрло бы их старыми значениями.
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in RATING_COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -214,6 +300,14 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-id', ]
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'author'],
+                                    name='unique_review_author'),
+        ]
+        # Ревью читаются по произведению страницами по -id.
+        indexes = [
+            models.Index(fields=['title', '-id'], name='review_title_id_idx'),
+        ]
         verbose_name = 'Ревью'
         verbose_name_plural = 'Ревью'
 
@@ -242,6 +336,78 @@ class Comment(models.Model):
     )
 
     class Meta:
-        ordering = ['-id', 'pub_date']
+        # pub_date растёт вместе с id, поэтому второй ключ сортировки
+        # не менял порядок, а только мешал читать по индексу.
+        ordering = ['-id', ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['review', '-id'],
+                         name='comment_review_id_idx'),
+        ]
+
+
+class TitleRanking(models.Model):
+    """Произведение на доске рейтинга api.leaderboards."""
+    board = models.CharField(max_length=32, verbose_name='Доска')
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='rankings',
+        verbose_name='Произведение'
+    )
+    score = models.FloatField(verbose_name='Взвешенная оценка')
+    votes = models.PositiveIntegerField(verbose_name='Количество оценок')
+
+    class Meta:
+        ordering = ['board', '-score', 'title_id']
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Рейтинги произведений'
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'title'],
+                                    name='unique_ranking_title'),
+        ]
+        indexes = [
+            models.Index(fields=['board', '-score', 'title'],
+                         name='ranking_board_score_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.board}: {self.title_id} {self.score:.2f}'
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди на отправку воркером send_outbox."""
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    from_email = models.CharField(max_length=254, verbose_name='Отправитель')
+    to = models.EmailField(verbose_name='Получатель')
+    status = models.CharField(
+        max_length=10,
+        choices=OutboxStatusChoices.choices,
+        default=OutboxStatusChoices.PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток отправки'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Следующая попытка'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания'
+    )
+    sent_at = models.DateTimeField(null=True, verbose_name='Дата отправки')
+
+    class Meta:
+        ordering = ['id', ]
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.to}: {self.subject}'
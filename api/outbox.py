@@ -0,0 +1,94 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import OutboxEmail, OutboxStatusChoices
+
+
+def enqueue_mail(subject, message, from_email, recipient):
+    """Ставит письмо в очередь. Отправит его воркер send_outbox."""
+    return OutboxEmail.objects.create(
+        subject=subject, body=message, from_email=from_email, to=recipient
+    )
+
+
+def retry_delay(attempts):
+    delay = settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return dt.timedelta(seconds=min(delay, settings.OUTBOX_RETRY_BACKOFF_MAX))
+
+
+def queue_depth():
+    now = timezone.now()
+    return OutboxEmail.objects.aggregate(
+        pending=Count('id', filter=Q(status=OutboxStatusChoices.PENDING)),
+        due=Count('id', filter=Q(status=OutboxStatusChoices.PENDING,
+                                 next_attempt_at__lte=now)),
+        failed=Count('id', filter=Q(status=OutboxStatusChoices.FAILED)),
+    )
+
+
+def _record_failure(email, error):
+    email.last_error = repr(error)
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboxStatusChoices.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+
+
+def send_batch(batch_size=None):
+    """Отправляет очередную пачку писем через одно соединение.
+
+    Строки блокируются на время отправки (SKIP LOCKED там, где он есть),
+    поэтому несколько воркеров не отправят одно письмо дважды.
+    Возвращает пару (отправлено, с ошибкой).
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxStatusChoices.PENDING,
+                    next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not emails:
+            return 0, 0
+        sent = failed = 0
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as error:
+            # SMTP недоступен или отверг вход: попытка засчитывается
+            # всей пачке, иначе письма выбирались бы снова без задержки.
+            for email in emails:
+                email.attempts += 1
+                _record_failure(email, error)
+            failed = len(emails)
+        else:
+            with connection:
+                for email in emails:
+                    email.attempts += 1
+                    try:
+                        EmailMessage(email.subject, email.body,
+                                     email.from_email, [email.to],
+                                     connection=connection).send()
+                    except Exception as error:
+                        failed += 1
+                        _record_failure(email, error)
+                        continue
+                    sent += 1
+                    email.status = OutboxStatusChoices.SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    # В письме код подтверждения открытым текстом: после
+                    # отправки он в БД не нужен.
+                    email.body = ''
+        OutboxEmail.objects.bulk_update(
+            emails,
+            ['status', 'attempts', 'next_attempt_at', 'last_error',
+             'sent_at', 'body']
+        )
+    return sent, failed
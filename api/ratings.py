@@ -0,0 +1,47 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Review, Title
+
+
+def change_rating(title_id, score_delta, count_delta):
+    # Сдвигаем счётчики выражением F(), чтобы параллельные запросы
+    # не затирали изменения друг друга.
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+    )
+
+
+def _actual_rating_expressions():
+    reviews = (Review.objects.filter(title=OuterRef('pk'))
+               .order_by().values('title'))
+    actual_sum = Subquery(
+        reviews.annotate(total=Sum('score')).values('total'),
+        output_field=IntegerField()
+    )
+    actual_count = Subquery(
+        reviews.annotate(total=Count('id')).values('total'),
+        output_field=IntegerField()
+    )
+    return Coalesce(actual_sum, 0), Coalesce(actual_count, 0)
+
+
+def find_rating_mismatches(queryset=None):
+    """Произведения, у которых сохранённый рейтинг расходится с ревью."""
+    if queryset is None:
+        queryset = Title.objects.all()
+    actual_sum, actual_count = _actual_rating_expressions()
+    return (
+        queryset.annotate(actual_sum=actual_sum, actual_count=actual_count)
+        .filter(~Q(rating_sum=F('actual_sum'))
+                | ~Q(rating_count=F('actual_count')))
+    )
+
+
+def rebuild_ratings(queryset=None):
+    """Пересчитывает сохранённый рейтинг одним UPDATE по ревью."""
+    if queryset is None:
+        queryset = Title.objects.all()
+    actual_sum, actual_count = _actual_rating_expressions()
+    return queryset.update(rating_sum=actual_sum, rating_count=actual_count)
@@ -0,0 +1,166 @@
+"""Воспроизведение журнала запросов против WSGI-приложения в процессе.
+
+Журнал - JSONL, по записи на строку:
+{"method": "GET", "path": "/api/v1/titles/", "body": {...}, "role": "user"}
+body и role необязательны, role - роль пользователя, от имени которого
+идёт запрос (без неё запрос анонимный). Строки без method и path
+пропускаются.
+"""
+import io
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+
+from .metrics import execute_wrapper, normalize_route
+from .models import User
+
+
+def load_records(path):
+    records, skipped = [], 0
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if (not isinstance(record, dict) or 'method' not in record
+                    or 'path' not in record):
+                skipped += 1
+                continue
+            records.append(record)
+    return records, skipped
+
+
+def route_of(method, path):
+    """Шаблон URL вида GET api/v1/titles/{title_id}/reviews/."""
+    try:
+        route = normalize_route(resolve(path.partition('?')[0]).route)
+    except Resolver404:
+        route = 'unresolved'
+    return f'{method.upper()} {route}'
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def tokens_for_roles(roles):
+    """JWT первого активного пользователя каждой роли."""
+    tokens = {}
+    for role in roles:
+        user = (User.objects.filter(role=role, is_active=True)
+                .order_by('id').first())
+        if user is None:
+            raise ValueError(f'Нет активного пользователя с ролью {role}')
+        tokens[role] = user.token
+    return tokens
+
+
+def build_environ(record, token=None):
+    body = record.get('body')
+    data = json.dumps(body).encode() if body is not None else b''
+    path, _, query = record['path'].partition('?')
+    environ = {
+        'REQUEST_METHOD': record['method'].upper(),
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(data)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(data),
+    }
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    setup_testing_defaults(environ)
+    return environ
+
+
+class Replayer:
+    """Гоняет записи журнала через application в пуле потоков."""
+
+    def __init__(self, application, tokens, concurrency=1):
+        self.application = application
+        self.tokens = tokens
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def call(self, record):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        environ = build_environ(record, self.tokens.get(record.get('role')))
+        started = time.perf_counter()
+        with execute_wrapper(count):
+            response = self.application(environ, start_response)
+            try:
+                for _ in response:
+                    pass
+            finally:
+                if hasattr(response, 'close'):
+                    response.close()
+        elapsed = time.perf_counter() - started
+        route = route_of(record['method'], record['path'])
+        with self.lock:
+            self.samples.setdefault(route, []).append(
+                (elapsed, len(queries), statuses[0])
+            )
+
+    def worker(self, record):
+        try:
+            self.call(record)
+        finally:
+            close_old_connections()
+
+    def run(self, records):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for future in [pool.submit(self.worker, record)
+                           for record in records]:
+                future.result()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, duration):
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            latencies = [sample[0] * 1000 for sample in samples]
+            queries = [sample[1] for sample in samples]
+            statuses = {}
+            for sample in samples:
+                statuses[str(sample[2])] = statuses.get(str(sample[2]), 0) + 1
+            routes[route] = {
+                'requests': len(samples),
+                'throughput': len(samples) / duration if duration else 0,
+                'p50_ms': percentile(latencies, 0.50),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+                'queries_mean': sum(queries) / len(queries),
+                'queries_max': max(queries),
+                'statuses': statuses,
+            }
+        total = sum(route['requests'] for route in routes.values())
+        return {
+            'concurrency': self.concurrency,
+            'duration_s': duration,
+            'requests': total,
+            'throughput': total / duration if duration else 0,
+            'routes': routes,
+        }
@@ -0,0 +1,116 @@
+"""Чтение с реплик и запись в основную БД.
+
+ReplicaRoutingMiddleware решает для каждого запроса, можно ли читать с
+реплики: можно только безопасным методам вне REPLICA_PRIMARY_PATHS и
+только если клиент недавно ничего не писал. После записи клиент
+REPLICA_STICKY_SECONDS читает из основной БД, чтобы увидеть свои же
+изменения, которые ещё не доехали до реплики. Клиент узнаётся по
+подписанной cookie и по хешу заголовка Authorization в кеше - API-клиенты
+с JWT cookie обычно не хранят.
+
+Вне запросов (команды, воркер outbox) всё идёт в основную БД.
+"""
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'yamdb_primary'
+STICKY_SALT = 'api.routers.sticky'
+STICKY_KEY = 'api:replica:sticky:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = threading.local()
+
+
+def current_replica():
+    return getattr(_state, 'replica', None)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica()
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики репликацией.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def _sticky_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return STICKY_KEY.format(
+        hashlib.sha1(authorization.encode()).hexdigest()
+    )
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+class ReplicaRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if self.can_use_replica(request):
+            _state.replica = random.choice(settings.DATABASE_REPLICAS)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.replica = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self.stick_to_primary(request, response)
+        return response
+
+    def can_use_replica(self, request):
+        if (not settings.DATABASE_REPLICAS
+                or request.method not in SAFE_METHODS):
+            return False
+        if request.path.startswith(tuple(settings.REPLICA_PRIMARY_PATHS)):
+            return False
+        return not self.is_sticky(request)
+
+    def is_sticky(self, request):
+        now = time.time()
+        try:
+            until = float(request.get_signed_cookie(
+                STICKY_COOKIE, salt=STICKY_SALT, default=0
+            ))
+        except ValueError:
+            until = 0
+        if until > now:
+            return True
+        key = _sticky_key(request)
+        return key is not None and (_cache().get(key) or 0) > now
+
+    def stick_to_primary(self, request, response):
+        window = settings.REPLICA_STICKY_SECONDS
+        until = time.time() + window
+        response.set_signed_cookie(STICKY_COOKIE, str(until),
+                                   salt=STICKY_SALT, max_age=window,
+                                   httponly=True)
+        key = _sticky_key(request)
+        if key is not None:
+            _cache().set(key, until, window)
@@ -0,0 +1,159 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Upper
+from django.utils.module_loading import import_string
+
+
+class BaseTitleSearchBackend:
+    """Поиск произведений по названию и описанию.
+
+    search() фильтрует queryset и аннотирует его полем search_rank,
+    update_vectors() обновляет хранимые данные после записи произведений.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def update_vectors(self, queryset):
+        pass
+
+
+class PostgresTitleSearchBackend(BaseTitleSearchBackend):
+    """tsvector в Title.search_vector с GIN-индексом и ранжированием."""
+
+    @property
+    def config(self):
+        return settings.TITLE_SEARCH_CONFIG
+
+    def vector(self):
+        return (SearchVector('name', weight='A', config=self.config)
+                + SearchVector('description', weight='B',
+                               config=self.config))
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, config=self.config)
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(search_rank=SearchRank(F('search_vector'),
+                                             search_query))
+            .order_by('-search_rank', '-id')
+        )
+
+    def update_vectors(self, queryset):
+        queryset.update(search_vector=self.vector())
+
+
+class SimpleTitleSearchBackend(BaseTitleSearchBackend):
+    """Переносимый поиск через icontains для SQLite и тестов.
+
+    Каждое слово запроса должно встретиться в названии или описании,
+    совпадение в названии весит больше, как вес 'A' у PostgreSQL.
+    """
+    name_weight = 1.0
+    description_weight = 0.4
+
+    def search(self, queryset, query):
+        terms = query.split()
+        if not terms:
+            return queryset.none()
+        rank = Value(0.0, output_field=FloatField())
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(description__icontains=term)
+            )
+            rank = (
+                rank
+                + Case(When(name__icontains=term,
+                            then=Value(self.name_weight)),
+                       default=Value(0.0), output_field=FloatField())
+                + Case(When(description__icontains=term,
+                            then=Value(self.description_weight)),
+                       default=Value(0.0), output_field=FloatField())
+            )
+        return (queryset.annotate(search_rank=rank)
+                .order_by('-search_rank', '-id'))
+
+
+class PostgresTrigramBackend:
+    """Нечёткое совпадение через pg_trgm.
+
+    Оператор % и icontains обслуживает один GIN-индекс по UPPER(name)
+    с gin_trgm_ops, поэтому сравниваем именно UPPER(поле).
+    """
+
+    def similar(self, queryset, field, value):
+        upper_field = f'{field}_upper'
+        return (
+            queryset.annotate(**{upper_field: Upper(field)})
+            .filter(**{f'{upper_field}__trigram_similar': value.upper()})
+            .annotate(similarity=TrigramSimilarity(Upper(field),
+                                                   value.upper()))
+            .order_by('-similarity', '-id')
+        )
+
+
+def trigrams(text):
+    # Те же триграммы, что строит pg_trgm: слова в нижнем регистре,
+    # дополненные двумя пробелами в начале и одним в конце.
+    result = set()
+    for word in re.findall(r'\w+', text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class SimpleTrigramBackend:
+    """Переносимая замена pg_trgm: сходство считается в Python."""
+    # Как pg_trgm.similarity_threshold по умолчанию.
+    similarity_threshold = 0.3
+    max_results = 500
+
+    def similar(self, queryset, field, value):
+        target = trigrams(value)
+        scored = []
+        rows = queryset.prefetch_related(None).values_list('pk', field)
+        for pk, text in rows.iterator():
+            candidate = trigrams(text or '')
+            if not candidate or not target:
+                continue
+            score = len(target & candidate) / len(target | candidate)
+            if score >= self.similarity_threshold:
+                scored.append((score, pk))
+        scored = sorted(scored, reverse=True)[:self.max_results]
+        if not scored:
+            return queryset.none()
+        ranking = Case(
+            *[When(pk=pk, then=Value(score)) for score, pk in scored],
+            default=Value(0.0), output_field=FloatField()
+        )
+        return (
+            queryset.filter(pk__in=[pk for _, pk in scored])
+            .annotate(similarity=ranking)
+            .order_by('-similarity', '-id')
+        )
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresTitleSearchBackend,
+}
+VENDOR_TRIGRAM_BACKENDS = {
+    'postgresql': PostgresTrigramBackend,
+}
+
+
+def get_search_backend(using='default'):
+    backend_path = getattr(settings, 'TITLE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    vendor = connections[using].vendor
+    return VENDOR_BACKENDS.get(vendor, SimpleTitleSearchBackend)()
+
+
+def get_trigram_backend(using='default'):
+    vendor = connections[using].vendor
+    return VENDOR_TRIGRAM_BACKENDS.get(vendor, SimpleTrigramBackend)()
@@ -1,9 +1,33 @@
 import datetime as dt
 
-from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
-from .models import Category, Comment, Genre, Review, RoleChoices, Title, User
+from .confirmation import InvalidConfirmationCode, redeem_code
+from .models import (Category, Comment, Genre, Review, RoleChoices, Title,
+                     TitleRanking, User)
+
+
+class PrefetchedSlugRelatedField(serializers.SlugRelatedField):
+    """Берёт объекты из context['related_objects'], если они там есть.
+
+    Пакетное создание загружает связанные объекты всех элементов
+    заранее, чтобы не делать запрос на каждый slug.
+    """
+
+    def to_internal_value(self, data):
+        related = self.context.get("related_objects", {})
+        objects = related.get(self.get_queryset().model)
+        if objects is None:
+            return super().to_internal_value(data)
+        if not isinstance(data, str):
+            self.fail("invalid")
+        try:
+            return objects[data]
+        except KeyError:
+            self.fail("does_not_exist", slug_name=self.slug_field,
+                      value=data)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -33,25 +57,23 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
-    confirmation_code = serializers.CharField(
-        source="password", required=False, write_only=True)
     username = serializers.CharField(
         required=False, write_only=True)
 
     class Meta:
         model = User
-        fields = ["email", "username", "confirmation_code"]
+        fields = ["email", "username"]
 
 
 class TokenSerializer(serializers.Serializer):
     email = serializers.CharField(max_length=255, write_only=True)
-    confirmation_code = serializers.CharField(source="password",
-                                              max_length=128, write_only=True)
+    confirmation_code = serializers.CharField(max_length=128,
+                                              write_only=True)
     token = serializers.CharField(max_length=255, read_only=True)
 
     def validate(self, data):
         email = data.get("email")
-        confirmation_code = data.get("password")
+        confirmation_code = data.get("confirmation_code")
         if email is None:
             raise serializers.ValidationError(
                 "An email address is required to log in."
@@ -60,11 +82,10 @@ class TokenSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "A confirmation_code is required to log in."
             )
-        user = authenticate(username=email, password=confirmation_code)
-        if user is None:
-            raise serializers.ValidationError(
-                "A user with this email and confirmation_code was not found."
-            )
+        try:
+            user = redeem_code(email, confirmation_code)
+        except InvalidConfirmationCode as error:
+            raise serializers.ValidationError(str(error))
         if not user.is_active:
             raise serializers.ValidationError(
                 "This user has been deactivated."
@@ -88,17 +109,24 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data["author"] = self.context["request"].user
-        return super().create(validated_data)
-
-    def validate(self, data):
-        author = self.context["request"].user
-        title = self.context["view"].kwargs.get("title_id")
-        if (Review.objects.filter(author=author, title=title).exists()
-                and self.context["request"].method == "POST"):
-            raise serializers.ValidationError(
-                "Error: Review is already exists"
-            )
-        return data
+        # Повторное ревью отсекает ограничение unique_review_author:
+        # предварительная проверка exists() не спасает от гонки.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    "Error: Review is already exists"
+                ]
+            })
+
+
+class ReviewBatchSerializer(ReviewSerializer):
+    """Ревью из пакетной загрузки: автор указывается в каждом элементе."""
+    author = PrefetchedSlugRelatedField(
+        slug_field="username", queryset=User.objects.all()
+    )
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -162,13 +190,13 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     genre = serializers.ListField(
-        child=serializers.SlugRelatedField(slug_field='slug',
-                                           required=False,
-                                           queryset=Genre.objects.all()),
+        child=PrefetchedSlugRelatedField(slug_field='slug',
+                                         required=False,
+                                         queryset=Genre.objects.all()),
         allow_empty=True,
         write_only=True
     )
-    category = serializers.SlugRelatedField(
+    category = PrefetchedSlugRelatedField(
         slug_field='slug', required=False, queryset=Category.objects.all()
     )
 
@@ -188,7 +216,7 @@ class TitleWriteSerializer(serializers.ModelSerializer):
 
 
 class TitleReadSerializer(serializers.ModelSerializer):
-    rating = serializers.IntegerField()
+    rating = serializers.IntegerField(read_only=True)
     genre = GenreSerializer(required=False, many=True, read_only=True)
     category = CategorySerializer(required=False, read_only=True)
 
@@ -200,3 +228,11 @@ class TitleReadSerializer(serializers.ModelSerializer):
             "name": {"required": True},
         }
         model = Title
+
+
+class TitleRankingSerializer(serializers.ModelSerializer):
+    title = TitleReadSerializer(read_only=True)
+
+    class Meta:
+        fields = ("score", "votes", "title")
+        model = TitleRanking
@@ -0,0 +1,190 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .caching import bump_version
+from .genre_index import genre_index
+from .leaderboards import board_name, refresh_rankings
+from .models import Category, Comment, Genre, Review, Title, TitleRanking, User
+from .ratings import change_rating
+from .search import get_search_backend
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_score(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._rated = (
+        Review.objects.filter(pk=instance.pk)
+        .values_list('title_id', 'score').first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    rated = instance.__dict__.pop('_rated', None)
+    if created or rated is None:
+        change_rating(instance.title_id, instance.score, 1)
+        return
+    old_title_id, old_score = rated
+    if old_title_id == instance.title_id:
+        if old_score != instance.score:
+            change_rating(instance.title_id, instance.score - old_score, 0)
+        return
+    change_rating(old_title_id, -old_score, -1)
+    change_rating(instance.title_id, instance.score, 1)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении пользователя или произведения.
+    change_rating(instance.title_id, -instance.score, -1)
+
+
+@receiver(post_save, sender=Title)
+def update_search_vector(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    get_search_backend().update_vectors(
+        Title.objects.filter(pk=instance.pk)
+    )
+
+
+def bump_model_version(sender, **kwargs):
+    bump_version(sender._meta.model_name)
+
+
+for versioned_model in (Genre, Category, Title, Review):
+    post_save.connect(bump_model_version, sender=versioned_model)
+    post_delete.connect(bump_model_version, sender=versioned_model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genres_version(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version('title')
+        bump_version('title_genre')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def bump_genre_index_version(sender, **kwargs):
+    # Индекс жанров знает жанры по slug: новые, удалённые и
+    # переименованные жанры - только через перестройку.
+    bump_version('title_genre')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def update_genre_index(sender, instance, action, reverse, pk_set,
+                       **kwargs):
+    if action.startswith('pre_'):
+        # Версия ещё не сменилась: актуален ли индекс до изменения.
+        instance._genre_index_fresh = genre_index.is_fresh()
+        return
+    fresh = instance.__dict__.pop('_genre_index_fresh', False)
+    ids = None if action == 'post_clear' else set(pk_set)
+    if reverse:
+        title_ids, genre_ids = ids, [instance.pk]
+    else:
+        title_ids, genre_ids = [instance.pk], ids
+    # После коммита и после того, как bump_version выставит итоговую
+    # версию: откаченное изменение не должно попасть в индекс.
+    transaction.on_commit(lambda: genre_index.apply(
+        action[len('post_'):], title_ids, genre_ids, fresh
+    ))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_title_reviews_version(sender, instance, **kwargs):
+    bump_version(f'review:title:{instance.title_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_review_comments_version(sender, instance, **kwargs):
+    bump_version(f'comment:review:{instance.review_id}')
+
+
+@receiver(pre_save, sender=User)
+def remember_username_change(sender, instance, raw=False, **kwargs):
+    instance._username_changed = bool(
+        not raw and instance.pk and User.objects.filter(
+            pk=instance.pk
+        ).exclude(username=instance.username).exists()
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_authored_versions(sender, instance, **kwargs):
+    # Ревью и комментарии показывают автора по username: списки, где
+    # он есть, должны получить новые ETag.
+    if not getattr(instance, '_username_changed', False):
+        return
+    title_ids = (Review.objects.filter(author=instance)
+                 .values_list('title_id', flat=True).order_by().distinct())
+    for title_id in title_ids:
+        bump_version(f'review:title:{title_id}')
+    review_ids = (Comment.objects.filter(author=instance)
+                  .values_list('review_id', flat=True).order_by()
+                  .distinct())
+    for review_id in review_ids:
+        bump_version(f'comment:review:{review_id}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_review_title_rankings(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_rankings([instance.title_id])
+
+
+@receiver(post_save, sender=Title)
+def refresh_title_rankings(sender, instance, created, raw=False, **kwargs):
+    # У нового произведения ещё нет оценок, а значит и мест в рейтинге.
+    if raw or created:
+        return
+    refresh_rankings([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def refresh_genre_rankings(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_rankings([instance.pk])
+    elif action == 'post_clear':
+        TitleRanking.objects.filter(
+            board=board_name('genre', instance.pk)
+        ).delete()
+    else:
+        refresh_rankings(pk_set)
+
+
+@receiver(post_delete, sender=Title)
+def delete_title_rankings(sender, instance, **kwargs):
+    # Каскад удаляет места произведения раньше его ревью, а post_delete
+    # ревью успевает вставить их снова.
+    TitleRanking.objects.filter(title_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Category)
+def delete_board(sender, instance, **kwargs):
+    # Связи с произведениями удаляются без сигналов m2m_changed и
+    # post_save, поэтому доску убираем целиком.
+    TitleRanking.objects.filter(
+        board=board_name(sender._meta.model_name, instance.pk)
+    ).delete()
@@ -0,0 +1,203 @@
+"""Ограничение частоты запросов к /auth/email/ и /auth/token/.
+
+Каждый ключ (IP или email) - корзина токенов: в ней до N токенов,
+каждый запрос забирает один, а пополняется она со скоростью N за
+период из DEFAULT_THROTTLE_RATES (например '5/hour'). Корзины лежат в
+SQLite-файле THROTTLE_DB_PATH, общем для всех воркеров gunicorn на
+машине; чтение и запись корзины - одна транзакция BEGIN IMMEDIATE, так
+что параллельные воркеры не тратят один токен дважды.
+
+Отказ запоминается и в памяти процесса до момента, когда в корзине
+появится токен: повторные запросы флуда отбиваются без обращения к
+файлу, БД и хешированию.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Корзина с самым долгим периодом ('N/day') полна через сутки простоя,
+# после этого её строка не нужна.
+PURGE_AFTER = 86400
+PURGE_INTERVAL = 3600
+
+
+def parse_rate(rate):
+    """'5/hour' -> (5, 3600), как у SimpleRateThrottle."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class BucketStore:
+    """Корзины токенов в SQLite-файле, общем для процессов."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.purged_at = 0.0
+
+    def connection(self):
+        # Соединение своё у каждого потока и не переживает fork.
+        if getattr(self.local, 'pid', None) != os.getpid():
+            path = settings.THROTTLE_DB_PATH
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection = sqlite3.connect(
+                path, timeout=settings.THROTTLE_DB_TIMEOUT,
+                isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL)'
+            )
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    def take(self, key, capacity, rate, now=None):
+        """Забирает токен из корзины key.
+
+        Возвращает 0, если токен был, иначе - сколько секунд ждать
+        следующего. rate - токенов в секунду.
+        """
+        now = time.time() if now is None else now
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated FROM buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens = capacity
+            if row is not None:
+                tokens = min(capacity, row[0] + (now - row[1]) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) '
+                'VALUES (?, ?, ?)', (key, tokens, now)
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        if now - self.purged_at > PURGE_INTERVAL:
+            self.purged_at = now
+            self.purge(PURGE_AFTER)
+        return wait
+
+    def purge(self, older_than):
+        """Удаляет корзины, не менявшиеся older_than секунд: они полны."""
+        self.connection().execute(
+            'DELETE FROM buckets WHERE updated < ?',
+            (time.time() - older_than,)
+        )
+
+    def clear(self):
+        self.connection().execute('DELETE FROM buckets')
+
+
+class RejectCache:
+    """Ключи, которым в этом процессе уже отказали, и срок отказа."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.until = {}
+
+    def wait(self, key, now):
+        with self.lock:
+            until = self.until.get(key)
+            if until is None:
+                return 0.0
+            if until <= now:
+                del self.until[key]
+                return 0.0
+            return until - now
+
+    def reject(self, key, until):
+        with self.lock:
+            if len(self.until) >= settings.THROTTLE_LOCAL_MAX_KEYS:
+                now = time.time()
+                self.until = {key: value for key, value
+                              in self.until.items() if value > now}
+                if len(self.until) >= settings.THROTTLE_LOCAL_MAX_KEYS:
+                    self.until.clear()
+            self.until[key] = until
+
+    def clear(self):
+        with self.lock:
+            self.until.clear()
+
+
+bucket_store = BucketStore()
+reject_cache = RejectCache()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Корзина токенов на ключ get_key() для view.throttle_scope.
+
+    Частота берётся из DEFAULT_THROTTLE_RATES по имени
+    '<throttle_scope>_<kind>'. Если хранилище недоступно, запрос
+    пропускается: ограничение не должно ронять вход.
+    """
+    kind = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def get_rate(self, view):
+        scope = f'{view.throttle_scope}_{self.kind}'
+        rates = settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+        return scope, parse_rate(rates[scope])
+
+    def allow_request(self, request, view):
+        ident = self.get_key(request)
+        if not ident:
+            return True
+        scope, (capacity, period) = self.get_rate(view)
+        key = f'{scope}:{ident}'
+        now = time.time()
+        self.wait_seconds = reject_cache.wait(key, now)
+        if self.wait_seconds:
+            return False
+        try:
+            self.wait_seconds = bucket_store.take(key, capacity,
+                                                  capacity / period, now)
+        except sqlite3.Error:
+            logger.exception('Хранилище корзин недоступно')
+            return True
+        if self.wait_seconds:
+            reject_cache.reject(key, now + self.wait_seconds)
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    kind = 'email'
+
+    def get_key(self, request):
+        if not hasattr(request.data, 'get'):
+            return None
+        email = request.data.get('email')
+        if not isinstance(email, str):
+            return None
+        return email.strip().lower()
@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    RegistrationAPIView, ReviewViewSet, TitleViewSet,
-                    TokenAPIView, UserViewSet)
+                    LeaderboardViewSet, RegistrationAPIView, ReviewViewSet,
+                    TitleViewSet, TokenAPIView, UserViewSet)
 
 router = DefaultRouter()
 
@@ -33,8 +33,17 @@ router.register(
     CategoryViewSet, basename='posts'
 )
 
+leaderboard = {'get': 'list'}
+
 app_name = 'api'
 urlpatterns = [
+    path('v1/leaderboards/', LeaderboardViewSet.as_view(leaderboard)),
+    path('v1/leaderboards/genres/<slug:slug>/',
+         LeaderboardViewSet.as_view(leaderboard, board_kind='genre')),
+    path('v1/leaderboards/categories/<slug:slug>/',
+         LeaderboardViewSet.as_view(leaderboard, board_kind='category')),
+    path('v1/leaderboards/years/<int:year>/',
+         LeaderboardViewSet.as_view(leaderboard, board_kind='year')),
     path('v1/auth/email/', RegistrationAPIView.as_view()),
     path('v1/auth/token/', TokenAPIView.as_view()),
     path('v1/', include(router.urls)),
@@ -1,52 +1,96 @@
-import random
-import string
-
 import django_filters.rest_framework
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
-from rest_framework import filters, status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .authentication import full_user
+from .batch import BatchCreateMixin, insert_objects
+from .caching import (CachedResponseMixin, ConditionalResponseMixin,
+                      bump_version)
+from .confirmation import issue_code
 from .custom_pagination import CustomPaginationClass
 from .custom_views import CreateListDestroyViewSet
-from .filters import TitleFilter
+from .export import export_titles
+from .facets import facet_counts
+from .fieldsets import SparseFieldsetMixin
+from .filters import TitleFilter, TitleSearchFilter, TrigramSearchFilter
+from .leaderboards import ALL, board_name, refresh_rankings, top_titles
+from .metrics import render as render_metrics
 from .models import Category, Comment, Genre, Review, Title, User
+from .outbox import enqueue_mail
 from .permissions import (IsAdminOrReadOnlyPermission, IsAdminPermission,
                           IsAuthorOrStaffReadOnly)
+from .ratings import rebuild_ratings
+from .search import get_search_backend
 from .serializers import (CategorySerializer, CommentSerializer,
                           GenreSerializer, RegistrationSerializer,
-                          ReviewSerializer, TitleReadSerializer,
+                          ReviewBatchSerializer, ReviewSerializer,
+                          TitleRankingSerializer, TitleReadSerializer,
                           TitleWriteSerializer, TokenSerializer,
                           UserSerializer)
+from .throttling import EmailThrottle, IPThrottle
+from .warmup import state as warmup_state
+from .warmup import warm_up
 
 
 class RegistrationAPIView(APIView):
+    # Без аутентификации: присланный токен не должен стоить запроса к
+    # БД ещё до проверки частоты.
+    authentication_classes = ()
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, EmailThrottle)
+    throttle_scope = 'registration'
+
+    def get_existing_user(self, data):
+        # Повторный запрос с теми же email и username выдаёт новый код:
+        # прежний мог истечь, исчерпать попытки или быть погашен.
+        email, username = data.get("email"), data.get("username")
+        if not isinstance(email, str) or not email:
+            return None
+        users = User.objects.filter(email=email)
+        if isinstance(username, str) and username:
+            users = users.filter(username=username)
+        return users.first()
 
     def post(self, request):
-        serializer = RegistrationSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        conf_code = "".join(random.choices(string.ascii_uppercase
-                                           + string.digits, k=6))
-        send_mail("Your confirmation code for YaMDB",
-                  f"Here is the code: {conf_code}",
-                  "from@example.com",
-                  [request.data["email"]],
-                  fail_silently=False, )
-        serializer.save(password=conf_code)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        user = self.get_existing_user(request.data)
+        if user is not None:
+            serializer = RegistrationSerializer(user)
+            response_status = status.HTTP_200_OK
+        else:
+            serializer = RegistrationSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            response_status = status.HTTP_201_CREATED
+        with transaction.atomic():
+            if user is None:
+                user = serializer.save()
+            conf_code = issue_code(user)
+            enqueue_mail("Your confirmation code for YaMDB",
+                         f"Here is the code: {conf_code}",
+                         "from@example.com",
+                         user.email)
+        return Response(serializer.data, status=response_status)
 
 
 class TokenAPIView(APIView):
+    authentication_classes = ()
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, EmailThrottle)
+    throttle_scope = 'token'
 
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -60,81 +104,326 @@ class UserViewSet(viewsets.ModelViewSet):
             methods=['get', 'patch'], url_path='me', )
     def update_self(self, request):
         # user = User.objects.get(username=request.user.username)
-        serializer = UserSerializer(request.user, data=request.data,
+        if request.method == 'GET':
+            # Пользователь из claims токена знает только id, username,
+            # email и роль; профиль берём из кеша или БД.
+            try:
+                user = full_user(request.user)
+            except User.DoesNotExist:
+                raise Http404
+            return Response(UserSerializer(user).data)
+        # request.user может быть снимком из кеша или собран из токена,
+        # поэтому для записи берём актуальную строку.
+        user = get_object_or_404(User, pk=request.user.pk)
+        serializer = UserSerializer(user, data=request.data,
                                     partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+def get_with_latest(queryset, children, pk, date_field):
+    """Родитель pk (или 404) и (pk, дата) его последней дочерней строки.
+
+    Один запрос: родитель и последняя строка коллекции для валидаторов.
+    """
+    children = children.order_by("-pk")
+    parent = get_object_or_404(queryset.annotate(
+        latest_pk=Subquery(children.values("pk")[:1]),
+        latest_date=Subquery(children.values(date_field)[:1]),
+    ), pk=pk)
+    if parent.latest_pk is None:
+        return parent, None
+    return parent, (parent.latest_pk, parent.latest_date)
+
+
+class ReviewViewSet(SparseFieldsetMixin, BatchCreateMixin,
+                    ConditionalResponseMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    batch_serializer_class = ReviewBatchSerializer
     permission_classes = [IsAuthorOrStaffReadOnly, ]
     pagination_class = CustomPaginationClass
+    validator_date_field = "pub_date"
+
+    def get_validator_versions(self):
+        return (f'review:title:{self.kwargs.get("title_id")}', )
+
+    def get_validator_latest(self):
+        self._title, latest = get_with_latest(
+            Title.objects.only("id"),
+            Review.objects.filter(title=OuterRef("pk")),
+            self.kwargs.get("title_id"), self.validator_date_field,
+        )
+        return latest
+
+    def get_title(self):
+        # Произведение нужно и get_queryset, и perform_create - читаем его
+        # один раз за запрос.
+        if not hasattr(self, "_title"):
+            self._title = get_object_or_404(
+                Title.objects.only("id"), pk=self.kwargs.get("title_id")
+            )
+        return self._title
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-        return title.reviews.all()
+        return self.get_title().reviews.select_related("author")
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
+    def check_batch_permissions(self, request):
+        # Пакетная загрузка ревью от имени разных авторов - для переноса
+        # данных, поэтому только для администратора.
+        if not request.user.role_is_admin:
+            self.permission_denied(request)
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def get_related_objects(self, items):
+        usernames = {item.get("author") for item in items
+                     if isinstance(item, dict)
+                     and isinstance(item.get("author"), str)}
+        return {User: User.objects.in_bulk(usernames,
+                                           field_name="username")}
+
+    def get_batch_errors(self, pending):
+        if not pending:
+            return {}
+        reviewed = set(Review.objects.filter(
+            title=self.get_title(),
+            author__in=[serializer.validated_data["author"]
+                        for serializer in pending.values()],
+        ).values_list("author_id", flat=True))
+        errors = {}
+        for index, serializer in pending.items():
+            author_id = serializer.validated_data["author"].pk
+            if author_id in reviewed:
+                errors[index] = {"non_field_errors": [
+                    "Error: Review is already exists"
+                ]}
+            reviewed.add(author_id)
+        return errors
+
+    def perform_batch_create(self, validated):
+        title = self.get_title()
+        reviews = [Review(title=title, **data) for data in validated]
+        insert_objects(reviews)
+        # bulk_create не шлёт сигналы: рейтинг и версии обновляем сами.
+        rebuild_ratings(Title.objects.filter(pk=title.pk))
+        refresh_rankings([title.pk])
+        bump_version("review")
+        bump_version(f"review:title:{title.pk}")
+        return reviews
+
+
+class CommentViewSet(SparseFieldsetMixin, ConditionalResponseMixin,
+                     viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsAuthorOrStaffReadOnly, ]
     pagination_class = CustomPaginationClass
+    validator_date_field = "pub_date"
+
+    def get_validator_versions(self):
+        return (f'comment:review:{self.kwargs.get("review_id")}', )
+
+    def get_validator_latest(self):
+        self._review, latest = get_with_latest(
+            Review.objects.only("id"),
+            Comment.objects.filter(review=OuterRef("pk")),
+            self.kwargs.get("review_id"), self.validator_date_field,
+        )
+        return latest
+
+    def get_review(self):
+        if not hasattr(self, "_review"):
+            self._review = get_object_or_404(
+                Review.objects.only("id"), pk=self.kwargs.get("review_id")
+            )
+        return self._review
 
     def get_queryset(self):
-        review = get_object_or_404(Review, pk=self.kwargs.get("review_id"))
-        return review.comments.all()
+        return self.get_review().comments.select_related("author")
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, pk=self.kwargs.get("review_id"))
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(SparseFieldsetMixin, BatchCreateMixin,
+                   ConditionalResponseMixin, CachedResponseMixin,
+                   viewsets.ModelViewSet):
     queryset = (
-        Title.objects.annotate(rating=Avg('reviews__score')).order_by('-id')
+        Title.objects.select_related('category').prefetch_related('genre')
+        .defer('search_vector').order_by('-id')
     )
     permission_classes = [IsAdminOrReadOnlyPermission, ]
     filter_backends = [
         django_filters.rest_framework.DjangoFilterBackend,
-        filters.SearchFilter
+        TitleSearchFilter
     ]
-    search_fields = ["title", ]
     filterset_class = TitleFilter
     pagination_class = CustomPaginationClass
+    cache_versions = ('title', 'genre', 'category', 'review')
+    validator_versions = cache_versions
+    sparse_sources = {'rating': ('rating_sum', 'rating_count')}
 
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PATCH'):
             return TitleWriteSerializer
         return TitleReadSerializer
 
+    def get_related_objects(self, items):
+        genres, categories = set(), set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if isinstance(item.get('genre'), list):
+                genres.update(slug for slug in item['genre']
+                              if isinstance(slug, str))
+            if isinstance(item.get('category'), str):
+                categories.add(item['category'])
+        return {
+            Genre: Genre.objects.in_bulk(genres, field_name='slug'),
+            Category: Category.objects.in_bulk(categories,
+                                               field_name='slug'),
+        }
+
+    def get_batch_errors(self, pending):
+        # Ограничение unique_title_name сериализатор не проверяет: один
+        # повтор уронил бы IntegrityError всю пачку.
+        names = [serializer.validated_data.get('name')
+                 for serializer in pending.values()]
+        taken = set(Title.objects.filter(name__in=names)
+                    .values_list('name', flat=True))
+        errors = {}
+        for index, serializer in pending.items():
+            name = serializer.validated_data.get('name')
+            if name in taken:
+                errors[index] = {'name': [
+                    'Title with this name already exists.'
+                ]}
+            taken.add(name)
+        return errors
 
-class GenreViewSet(CreateListDestroyViewSet):
+    def perform_batch_create(self, validated):
+        titles, genres = [], []
+        for data in validated:
+            data = dict(data)
+            genres.append(data.pop('genre', []))
+            titles.append(Title(**data))
+        insert_objects(titles)
+        through = Title.genre.through
+        through.objects.bulk_create([
+            through(title_id=title.pk, genre_id=genre.pk)
+            for title, title_genres in zip(titles, genres)
+            for genre in title_genres
+        ])
+        # bulk_create не шлёт сигналы: векторы поиска и версию кеша
+        # обновляем сами.
+        get_search_backend().update_vectors(
+            Title.objects.filter(pk__in=[title.pk for title in titles])
+        )
+        bump_version('title')
+        bump_version('title_genre')
+        return titles
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAdminPermission])
+    def export(self, request):
+        # Учитывает те же фильтры, что и список, но без пагинации.
+        queryset = self.filter_queryset(Title.objects.all())
+        return StreamingHttpResponse(
+            export_titles(queryset, chunk_size=settings.EXPORT_CHUNK_SIZE),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        # Счётчики по жанрам, категориям и годам для тех же фильтров,
+        # что и список; кешируются так же, как ответы списка.
+        return self.cached_response(self.get_facets, request)
+
+    def get_facets(self, request):
+        queryset = self.filter_queryset(Title.objects.all())
+        return Response(facet_counts(queryset))
+
+
+class GenreViewSet(CachedResponseMixin, CreateListDestroyViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [IsAdminOrReadOnlyPermission, ]
     filter_backends = [
-        filters.SearchFilter
+        TrigramSearchFilter
     ]
     lookup_field = 'slug'
     search_fields = ["name", ]
     pagination_class = CustomPaginationClass
+    cache_versions = ('genre', )
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(CachedResponseMixin, CreateListDestroyViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnlyPermission, ]
     filter_backends = [
-        filters.SearchFilter
+        TrigramSearchFilter
     ]
     lookup_field = 'slug'
     search_fields = ["name", ]
     pagination_class = CustomPaginationClass
+    cache_versions = ('category', )
+
+
+class LeaderboardViewSet(CachedResponseMixin, mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    """Топ произведений по взвешенной оценке, см. api/leaderboards.py.
+
+    Вид доски задаётся в urls.py через board_kind: all, genre и
+    category ищутся по slug из URL, year - по году.
+    """
+    serializer_class = TitleRankingSerializer
+    permission_classes = [AllowAny, ]
+    filter_backends = []
+    pagination_class = None
+    cache_versions = ('ranking', 'title', 'genre', 'category')
+    board_kind = ALL
+
+    def get_board(self):
+        if self.board_kind == ALL:
+            return board_name(ALL)
+        if self.board_kind == 'year':
+            return board_name('year', self.kwargs['year'])
+        model = {'genre': Genre, 'category': Category}[self.board_kind]
+        obj = get_object_or_404(model.objects.only('id'),
+                                slug=self.kwargs['slug'])
+        return board_name(self.board_kind, obj.pk)
+
+    def get_limit(self):
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return settings.LEADERBOARD_DEFAULT_LIMIT
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({'limit': ['Ожидается целое число.']})
+        return min(max(limit, 1), settings.LEADERBOARD_MAX_LIMIT)
+
+    def get_queryset(self):
+        return top_titles(self.get_board(), self.get_limit())
+
+
+def metrics_view(request):
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def ready_view(request):
+    # Прогрев при старте не удался (например, БД ещё поднималась):
+    # пробуем снова, без пробных запросов.
+    if not warmup_state['ready'] and warmup_state['failed']:
+        warm_up()
+    if not warmup_state['ready']:
+        return JsonResponse({'status': 'warming up'}, status=503)
+    return JsonResponse({'status': 'ready',
+                         'warmup_seconds': warmup_state['seconds']})
@@ -0,0 +1,101 @@
+"""Прогрев воркера до того, как он начнёт принимать запросы.
+
+Django и DRF многое строят лениво на первом запросе: разбор URL
+роутера, поля сериализаторов, соединение с БД, кеш ContentType,
+классы фильтров. warm_up() делает это заранее, а /ready отвечает 200
+только после него. В gunicorn warm_up() вызывается из хука
+post_worker_init (gunicorn.conf.py), до того как воркер начнёт
+принимать соединения.
+
+БД при старте контейнера может быть ещё недоступна. При старте
+делается одна попытка: повторы с паузами в post_worker_init могли бы
+занять больше timeout воркера gunicorn, и арбитр убил бы его. Если
+попытка не удалась, воркер всё равно стартует: исключение из
+post_worker_init уронило бы его, и gunicorn перезапускал бы воркер по
+кругу. /ready отвечает 503 и на каждом запросе пробует прогреться ещё
+раз, так что повторы идут с частотой healthcheck.
+"""
+import io
+import logging
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.urls import get_resolver
+from rest_framework import serializers as drf_serializers
+
+from . import serializers
+
+logger = logging.getLogger(__name__)
+# Ключ WSGI environ, по которому middleware узнают запросы прогрева.
+WARMUP_ENVIRON_KEY = 'yamdb.warmup'
+
+state = {'ready': False, 'seconds': None, 'failed': False}
+
+
+def _build_serializers():
+    for value in vars(serializers).values():
+        if (isinstance(value, type)
+                and issubclass(value, drf_serializers.BaseSerializer)
+                and value.__module__ == serializers.__name__):
+            value(context={}).fields
+
+
+def _request(application, path):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(),
+        WARMUP_ENVIRON_KEY: True,
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ,
+                           lambda status, headers, exc_info=None:
+                           statuses.append(status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return statuses[0]
+
+
+def warm_up(application=None):
+    """Прогревает процесс и отмечает его готовым к трафику.
+
+    application - WSGI-приложение для пробных GET из WARMUP_PATHS;
+    без него пробные запросы не делаются. Возвращает, удался ли прогрев;
+    исключения не пробрасывает.
+    """
+    try:
+        _warm_up(application)
+    except Exception:
+        logger.exception('Прогрев не удался, повтор - через /ready')
+        connection.close()
+        state['failed'] = True
+        return False
+    state['failed'] = False
+    return True
+
+
+def _warm_up(application):
+    started = time.perf_counter()
+    get_resolver().reverse_dict
+    _build_serializers()
+    connection.ensure_connection()
+    ContentType.objects.get_for_models(*apps.get_models())
+    if application is not None:
+        for path in settings.WARMUP_PATHS:
+            status = _request(application, path)
+            if not status.startswith('200'):
+                logger.warning('Прогрев %s: %s', path, status)
+    state['seconds'] = time.perf_counter() - started
+    state['ready'] = True
+    logger.info('Воркер прогрет за %.2f с', state['seconds'])
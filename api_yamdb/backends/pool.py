@@ -0,0 +1,260 @@
+"""Пул соединений с БД на процесс для бэкендов pooled_*.
+
+Django открывает соединение на каждый запрос и закрывает его в конце
+(при CONN_MAX_AGE = 0). Бэкенды pooled_* вместо этого берут соединение
+из пула и возвращают его обратно. Настройки - ключ POOL в DATABASES:
+
+    'POOL': {
+        'MIN_SIZE': 1,        # открыть при первом обращении и держать
+        'MAX_SIZE': 10,       # больше соединений процесс не откроет
+        'TIMEOUT': 5,         # сколько ждать свободное соединение, с
+        'RECYCLE': 1800,      # пересоздавать соединения старше, с
+        'MAX_IDLE': 300,      # закрывать простаивающие сверх MIN_SIZE, с
+        'PRE_PING': True,     # проверять соединение перед выдачей
+    }
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+DEFAULTS = {
+    'MIN_SIZE': 1,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5,
+    'RECYCLE': 1800,
+    'MAX_IDLE': 300,
+    'PRE_PING': True,
+}
+COUNTERS = ('checkouts', 'created', 'reused', 'waits', 'exhausted',
+            'recycled', 'ping_failures', 'discarded', 'closed_idle')
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Потокобезопасный пул DB-API соединений.
+
+    factory() открывает новое соединение, ping(connection) проверяет
+    его, close(connection) закрывает. Соединение, которое не прошло
+    проверку или старше RECYCLE, закрывается и заменяется новым.
+    """
+
+    def __init__(self, options=None, ping=None, close=None):
+        self.options = dict(DEFAULTS, **(options or {}))
+        self.ping = ping
+        self.close = close or (lambda connection: connection.close())
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.opened_at = {}
+        self.size = 0
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.wait_seconds = 0.0
+
+    def checkout(self, factory):
+        deadline = time.monotonic() + self.options['TIMEOUT']
+        while True:
+            connection = self._take(deadline)
+            if connection is None:
+                connection = self._open(factory)
+                try:
+                    self._fill(factory)
+                except Exception:
+                    # Соединение для запроса уже есть, остальные
+                    # откроются позже.
+                    pass
+                return connection
+            if self._healthy(connection):
+                self._count('reused')
+                return connection
+            self._discard(connection)
+
+    def checkin(self, connection, healthy=True):
+        if not healthy or self._expired(connection):
+            self._discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+        self._close_idle()
+
+    def stats(self):
+        with self.condition:
+            return dict(self.counters, wait_seconds=self.wait_seconds,
+                        idle=len(self.idle), in_use=self.size - len(self.idle),
+                        size=self.size, max_size=self.options['MAX_SIZE'])
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+            self.size -= len(idle)
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _count(self, name, value=1):
+        with self.condition:
+            self.counters[name] += value
+
+    def _take(self, deadline):
+        """Свободное соединение или None, если можно открыть новое."""
+        with self.condition:
+            self.counters['checkouts'] += 1
+            waited = None
+            while not self.idle and self.size >= self.options['MAX_SIZE']:
+                remaining = deadline - time.monotonic()
+                if waited is None:
+                    waited = time.monotonic()
+                    self.counters['waits'] += 1
+                if remaining <= 0:
+                    self.wait_seconds += time.monotonic() - waited
+                    self.counters['exhausted'] += 1
+                    raise PoolTimeout(
+                        f'Нет свободного соединения в пуле за '
+                        f'{self.options["TIMEOUT"]} с '
+                        f'(MAX_SIZE={self.options["MAX_SIZE"]})'
+                    )
+                self.condition.wait(remaining)
+            if waited is not None:
+                self.wait_seconds += time.monotonic() - waited
+            if self.idle:
+                return self.idle.pop()[0]
+            self.size += 1
+            return None
+
+    def _open(self, factory):
+        try:
+            connection = factory()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opened_at[id(connection)] = time.monotonic()
+            self.counters['created'] += 1
+        return connection
+
+    def _fill(self, factory):
+        # До MIN_SIZE пул добирает соединения сразу, а не по одному
+        # на каждый следующий запрос.
+        while True:
+            with self.condition:
+                if self.size >= self.options['MIN_SIZE']:
+                    return
+                self.size += 1
+            connection = self._open(factory)
+            self.checkin(connection)
+
+    def _expired(self, connection):
+        recycle = self.options['RECYCLE']
+        opened_at = self.opened_at.get(id(connection), 0)
+        return bool(recycle) and time.monotonic() - opened_at > recycle
+
+    def _healthy(self, connection):
+        if self._expired(connection):
+            self._count('recycled')
+            return False
+        if self.options['PRE_PING'] and self.ping is not None:
+            try:
+                self.ping(connection)
+            except Exception:
+                self._count('ping_failures')
+                return False
+        return True
+
+    def _discard(self, connection):
+        with self.condition:
+            self.size -= 1
+            self.counters['discarded'] += 1
+            self.condition.notify()
+        self._close(connection)
+
+    def _close(self, connection):
+        self.opened_at.pop(id(connection), None)
+        try:
+            self.close(connection)
+        except Exception:
+            pass
+
+    def _close_idle(self):
+        max_idle = self.options['MAX_IDLE']
+        if not max_idle:
+            return
+        expired = []
+        with self.condition:
+            now = time.monotonic()
+            # Самые давно простаивающие - в начале очереди.
+            while (len(self.idle) > self.options['MIN_SIZE']
+                   and now - self.idle[0][1] > max_idle):
+                expired.append(self.idle.popleft()[0])
+                self.size -= 1
+                self.counters['closed_idle'] += 1
+        for connection in expired:
+            self._close(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(alias, options, ping=None):
+    """Пул соединений алиаса БД в текущем процессе.
+
+    После fork (gunicorn --preload) пулы родителя не используются:
+    их сокеты общие с родителем.
+    """
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(options, ping=ping)
+        return _pools[alias]
+
+
+def all_stats():
+    with _pools_lock:
+        pools = dict(_pools) if _pools_pid == os.getpid() else {}
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """Подмешивается к DatabaseWrapper: соединения берутся из пула.
+
+    Бэкенд определяет ping_connection() и reset_connection(); последний
+    откатывает незавершённую транзакцию перед возвратом в пул.
+    """
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL'),
+                        ping=self.ping_connection)
+
+    def get_new_connection(self, conn_params):
+        parent = super()
+        return self.get_pool().checkout(
+            lambda: parent.get_new_connection(conn_params)
+        )
+
+    def _close(self):
+        connection = self.connection
+        healthy = not self.errors_occurred or self.is_usable()
+        if healthy:
+            try:
+                self.reset_connection(connection)
+            except Exception:
+                healthy = False
+        self.get_pool().checkin(connection, healthy=healthy)
+
+    @staticmethod
+    def ping_connection(connection):
+        raise NotImplementedError
+
+    @staticmethod
+    def reset_connection(connection):
+        raise NotImplementedError
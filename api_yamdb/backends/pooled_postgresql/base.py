@@ -0,0 +1,32 @@
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений на процесс (ключ POOL в DATABASES)."""
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        # Для соединения из пула родительский get_new_connection не
+        # вызывался, а _set_autocommit() ждёт isolation_level.
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    @staticmethod
+    def ping_connection(connection):
+        if connection.closed:
+            raise base.Database.InterfaceError('connection already closed')
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+
+    @staticmethod
+    def reset_connection(connection):
+        status = connection.get_transaction_status()
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
@@ -0,0 +1,16 @@
+from django.db.backends.sqlite3 import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite с пулом соединений - для тестов и локальной разработки."""
+
+    @staticmethod
+    def ping_connection(connection):
+        connection.execute('SELECT 1')
+
+    @staticmethod
+    def reset_connection(connection):
+        if connection.in_transaction:
+            connection.rollback()
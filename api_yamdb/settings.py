@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,12 +19,15 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
-    'api',
+    'api.apps.ApiConfig',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,19 +62,68 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# DB_ENGINE=api_yamdb.backends.pooled_postgresql включает пул соединений
+# (api_yamdb/backends/pool.py), настройки пула - в POOL. С пулом
+# CONN_MAX_AGE оставляйте 0: соединение возвращается в пул в конце запроса.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('POSTGRES_USER'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'MAX_IDLE': int(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'PRE_PING': True,
+        },
     }
 }
+# Без connect_timeout недоступный хост БД держал бы прогрев воркера до
+# таймаута TCP, дольше timeout воркера gunicorn (30 с).
+if 'postgresql' in DATABASES['default']['ENGINE']:
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+    }
+
+# Реплики для чтения: DB_REPLICA_HOSTS=host1,host2 добавляет алиасы
+# replica_1, replica_2 с теми же настройками, что у default.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip(),
+                            TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+# После записи клиент столько секунд читает из основной БД.
+REPLICA_STICKY_SECONDS = 10
+# Ответы с реплики не кешируются, если данные менялись недавнее этого.
+REPLICA_MAX_LAG = 5
+REPLICA_PRIMARY_PATHS = ['/api/v1/auth/']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
+# Файловый кеш общий для всех воркеров gunicorn в контейнере:
+# на нём держатся версии моделей для кеша ответов API.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    # Версии моделей и блокировки кеша ответов: add() атомарен между
+    # воркерами, записи не вытесняются (см. api/cache_backends.py).
+    'versions': {
+        'BACKEND': 'api.cache_backends.AtomicFileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'versions'),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -125,11 +178,21 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 25
+    'PAGE_SIZE': 25,
+
+    # Корзины токенов api.throttling для /auth/email/ и /auth/token/.
+    'DEFAULT_THROTTLE_RATES': {
+        'registration_ip': '20/hour',
+        'registration_email': '5/hour',
+        'token_ip': '60/hour',
+        'token_email': '10/hour',
+    },
+    # IP клиента - последний адрес X-Forwarded-For, его добавляет nginx.
+    'NUM_PROXIES': 1,
 }
 
 AUTH_USER_MODEL = 'api.User'
@@ -141,3 +204,92 @@ SIMPLE_JWT = {'ACCESS_TOKEN_LIFETIME': timedelta(days=360),
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 EMAIL_ADMIN = "from_admin@example.com"
+
+# Полнотекстовый поиск произведений, см. api/search.py.
+# Бэкенд выбирается по СУБД, если не задан явно.
+TITLE_SEARCH_BACKEND = os.environ.get('TITLE_SEARCH_BACKEND')
+TITLE_SEARCH_CONFIG = 'simple'
+
+# Кеш GET-ответов списков, см. api/caching.py.
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_VERSIONS_ALIAS = 'versions'
+RESPONSE_CACHE_TIMEOUT = 300
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+RESPONSE_CACHE_LOCK_WAIT = 5
+RESPONSE_CACHE_LOCK_POLL = 0.02
+
+# Очередь писем, см. api/outbox.py и команду send_outbox.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BACKOFF = 30
+OUTBOX_RETRY_BACKOFF_MAX = 3600
+OUTBOX_POLL_INTERVAL = 2
+
+# Коды подтверждения для /auth/token/, см. api/confirmation.py.
+CONFIRMATION_CODE_LENGTH = 6
+CONFIRMATION_CODE_TTL = 30 * 60
+CONFIRMATION_CODE_MAX_ATTEMPTS = 5
+
+# Кеш пользователей для api.authentication.CachedJWTAuthentication.
+# Кеш свой в каждом процессе, поэтому TTL ограничивает, как долго другой
+# воркер видит старую роль после изменения пользователя.
+AUTH_USER_CACHE_SIZE = 10000
+AUTH_USER_CACHE_TTL = 30
+# Брать роль из claims токена без обращения к БД. Смена роли или
+# блокировка вступят в силу только с новым токеном.
+AUTH_STATELESS_TOKENS = False
+
+# Размер пачки manage.py import_data: строк на один INSERT/COPY и коммит.
+IMPORT_BATCH_SIZE = 5000
+
+# Больше объектов в одном POST со списком не принимаем (ответ 413):
+# большая пачка надолго заняла бы воркер.
+BATCH_CREATE_MAX_ITEMS = 500
+
+# Выгрузка /titles/export/ и manage.py export_titles: строк на одно
+# чтение из курсора и один запрос жанров.
+EXPORT_CHUNK_SIZE = 2000
+
+# Метрики для /metrics: каталог файлов процессов gunicorn и как часто
+# процесс сбрасывает в него свои счётчики (в секундах).
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'yamdb_metrics')
+)
+METRICS_FLUSH_INTERVAL = 1
+
+# GET-запросы, которыми gunicorn.conf.py прогревает воркер перед /ready.
+WARMUP_PATHS = [
+    '/api/v1/titles/',
+    '/api/v1/titles/?pagination=cursor',
+    '/api/v1/genres/',
+    '/api/v1/categories/',
+]
+
+# Рейтинги /api/v1/leaderboards/, см. api/leaderboards.py. Оценка -
+# байесовское среднее: LEADERBOARD_PRIOR_VOTES воображаемых оценок,
+# равных LEADERBOARD_PRIOR_MEAN. После их изменения нужен
+# manage.py rebuild_leaderboards.
+LEADERBOARD_PRIOR_VOTES = 5
+LEADERBOARD_PRIOR_MEAN = 5.5
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+# Файл корзин api.throttling, общий для воркеров gunicorn на машине, и
+# сколько секунд ждать его блокировки. THROTTLE_LOCAL_MAX_KEYS - предел
+# отказов, которые процесс помнит в памяти.
+THROTTLE_DB_PATH = os.environ.get(
+    'THROTTLE_DB_PATH',
+    os.path.join(tempfile.gettempdir(), 'yamdb_throttle', 'buckets.sqlite3')
+)
+THROTTLE_DB_TIMEOUT = 1
+THROTTLE_LOCAL_MAX_KEYS = 100000
+
+# Фильтр ?genre= через индекс жанров в памяти процесса
+# (api/genre_index.py). Индекс перестраивается при смене версии
+# title_genre и не реже раза в GENRE_INDEX_MAX_AGE секунд.
+GENRE_INDEX_ENABLED = True
+GENRE_INDEX_MAX_AGE = 300
+# Больше стольких найденных id список в SQL не передаётся: фильтр
+# выполняется JOIN через ORM.
+GENRE_INDEX_MAX_IDS = 10000
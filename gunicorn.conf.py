@@ -0,0 +1,22 @@
+import os
+
+bind = '0.0.0.0:8000'
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+# С GUNICORN_PRELOAD=1 приложение импортируется до fork, и воркеры
+# получают уже загруженные модули.
+preload_app = os.environ.get('GUNICORN_PRELOAD') == '1'
+
+
+def child_exit(server, worker):
+    # Счётчики завершившегося воркера - в архив, его gauge - из суммы.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    django.setup()
+    from api.metrics import archive_worker
+    archive_worker(worker.pid)
+
+
+def post_worker_init(worker):
+    # Воркер начнёт принимать соединения только после прогрева.
+    from api.warmup import warm_up
+    warm_up(worker.wsgi)
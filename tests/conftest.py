@@ -1,9 +1,26 @@
 import sys
 from os.path import abspath, dirname
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 
 
 pytest_plugins = [
+    'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache, caches
+
+    from api.authentication import user_cache
+    from api.throttling import bucket_store, reject_cache
+    cache.clear()
+    caches['versions'].clear()
+    user_cache.clear()
+    bucket_store.clear()
+    reject_cache.clear()
@@ -0,0 +1,40 @@
+import pytest
+
+from api.models import Category, Comment, Genre, Review, Title
+
+
+@pytest.fixture
+def genres():
+    return [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name='Фильм', slug='film')
+
+
+@pytest.fixture
+def title(genres, category):
+    title = Title.objects.create(
+        name='Произведение', year=2000, description='Описание',
+        category=category
+    )
+    title.genre.set(genres[:2])
+    return title
+
+
+@pytest.fixture
+def review(title, user):
+    return Review.objects.create(
+        title=title, author=user, text='Текст ревью', score=7
+    )
+
+
+@pytest.fixture
+def comment(review, user):
+    return Comment.objects.create(
+        review=review, author=user, text='Текст комментария'
+    )
@@ -0,0 +1,78 @@
+import datetime as dt
+
+import pytest
+
+from api.models import ConfirmationCode, OutboxEmail, User
+
+
+def register(client, email='new@yamdb.fake', username='new', status=201):
+    response = client.post('/api/v1/auth/email/',
+                           {'email': email, 'username': username})
+    assert response.status_code == status
+    body = OutboxEmail.objects.filter(to=email).latest('id').body
+    return body.rsplit(' ', 1)[-1]
+
+
+def get_token(client, code, email='new@yamdb.fake'):
+    return client.post('/api/v1/auth/token/',
+                       {'email': email, 'confirmation_code': code})
+
+
+@pytest.mark.django_db
+class TestConfirmationCode:
+
+    def test_code_gives_token_once(self, client):
+        code = register(client)
+        response = get_token(client, code)
+        assert response.status_code == 200
+        assert response.json()['token']
+        assert User.objects.get(email='new@yamdb.fake').password is None, (
+            'Проверьте, что код не хранится в поле password'
+        )
+        assert get_token(client, code).status_code == 400, (
+            'Проверьте, что код подтверждения одноразовый'
+        )
+
+    def test_code_is_stored_as_hmac(self, client):
+        code = register(client)
+        stored = ConfirmationCode.objects.get()
+        assert code not in stored.code_hash
+        assert len(stored.code_hash) == 40
+
+    def test_attempts_are_limited(self, client, settings):
+        code = register(client)
+        for _ in range(settings.CONFIRMATION_CODE_MAX_ATTEMPTS):
+            assert get_token(client, 'WRONG1').status_code == 400
+        assert get_token(client, code).status_code == 400, (
+            'Проверьте, что после исчерпания попыток код не принимается'
+        )
+
+    def test_expired_code(self, client):
+        code = register(client)
+        ConfirmationCode.objects.update(
+            expires_at=ConfirmationCode.objects.get().created_at
+            - dt.timedelta(seconds=1)
+        )
+        assert get_token(client, code).status_code == 400
+        assert not ConfirmationCode.objects.exists()
+
+    def test_new_code_after_expiry(self, client):
+        register(client)
+        ConfirmationCode.objects.update(
+            expires_at=ConfirmationCode.objects.get().created_at
+            - dt.timedelta(seconds=1)
+        )
+        code = register(client, status=200)
+        assert get_token(client, code).status_code == 200, (
+            'Проверьте, что после истечения кода можно запросить новый'
+        )
+        code = register(client, status=200)
+        assert get_token(client, code).status_code == 200
+        assert User.objects.filter(email='new@yamdb.fake').count() == 1
+
+    def test_other_username_is_rejected(self, client):
+        register(client)
+        response = client.post('/api/v1/auth/email/',
+                               {'email': 'new@yamdb.fake',
+                                'username': 'other'})
+        assert response.status_code == 400
@@ -0,0 +1,92 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import user_cache
+
+ME_URL = '/api/v1/users/me/'
+
+
+def _token_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {user.token}')
+    return client
+
+
+class TestCachedJWTAuthentication:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_is_cached(self, user_client):
+        before = user_cache.stats()
+        user_client.get(ME_URL)
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get(ME_URL)
+        assert response.status_code == 200, (
+            f'Проверьте, что `{ME_URL}` отвечает авторизованному пользователю'
+        )
+        assert len(queries) == 0, (
+            'Проверьте, что повторный запрос с тем же токеном не читает '
+            'пользователя из БД'
+        )
+        stats = user_cache.stats()
+        assert (stats['hits'] - before['hits'] == 1
+                and stats['misses'] - before['misses'] == 1), (
+            'Проверьте, что кеш пользователей считает попадания и промахи'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_save_invalidates_cache(self, user, user_client):
+        user_client.get(ME_URL)
+        before = user_cache.stats()['invalidations']
+        user.role = 'moderator'
+        user.save()
+        response = user_client.get(ME_URL)
+        assert response.json()['role'] == 'moderator', (
+            'Проверьте, что изменение пользователя сбрасывает его в кеше'
+        )
+        assert user_cache.stats()['invalidations'] == before + 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_inactive_user_rejected(self, user, user_client):
+        user.is_active = False
+        user.save()
+        response = user_client.get(ME_URL)
+        assert response.status_code == 401, (
+            'Проверьте, что заблокированный пользователь не проходит '
+            'аутентификацию'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stateless_tokens(self, settings, user, title):
+        settings.AUTH_STATELESS_TOKENS = True
+        client = _token_client(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+        assert not any('api_user' in query['sql'] for query in queries), (
+            'Проверьте, что с AUTH_STATELESS_TOKENS пользователь берётся '
+            'из токена без обращения к БД'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_me_with_stateless_token(self, settings, user):
+        settings.AUTH_STATELESS_TOKENS = True
+        user.first_name, user.last_name, user.bio = 'Иван', 'Петров', 'Био'
+        user.save()
+        response = _token_client(user).get(ME_URL)
+        assert response.status_code == 200
+        data = response.json()
+        assert (data['first_name'], data['last_name'], data['bio']) == (
+            'Иван', 'Петров', 'Био'
+        ), 'Проверьте, что `/users/me/` отдаёт профиль и с токеном без БД'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_patch_me_with_stateless_token(self, settings, user):
+        settings.AUTH_STATELESS_TOKENS = True
+        response = _token_client(user).patch(ME_URL, {'first_name': 'Ivan'})
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert user.first_name == 'Ivan' and user.email == 'user@yamdb.fake', (
+            'Проверьте, что PATCH `/users/me/` изменяет только переданные поля'
+        )
@@ -0,0 +1,105 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Review, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+@pytest.mark.django_db
+class TestBatchCreate:
+
+    def test_titles_batch(self, admin_client, genres, category):
+        payload = [
+            {'name': 'Alpha', 'year': 1999, 'category': category.slug,
+             'genre': [genres[0].slug, genres[1].slug]},
+            {'name': 'Beta', 'year': 2001, 'genre': [genres[2].slug]},
+            {'name': 'Gamma', 'year': 2000, 'genre': ['missing']},
+            {'year': 2000},
+        ]
+        response = admin_client.post(TITLES_URL, data=payload,
+                                     format='json')
+        assert response.status_code == 207, (
+            'Проверьте, что частично успешная пачка возвращает статус 207'
+        )
+        results = response.json()
+        assert [item['status'] for item in results] == [201, 201, 400, 400]
+        assert 'genre' in results[2]['errors']
+        assert 'name' in results[3]['errors']
+        alpha = Title.objects.get(pk=results[0]['data']['id'])
+        assert alpha.category == category
+        assert set(alpha.genre.all()) == set(genres[:2]), (
+            'Проверьте, что пакетное создание связывает жанры'
+        )
+
+    def test_titles_batch_duplicate_names(self, admin_client, title,
+                                          genres):
+        payload = [
+            {'name': name, 'year': 2000, 'genre': [genres[0].slug]}
+            for name in ('Alpha', title.name, 'Beta', 'Alpha')
+        ]
+        response = admin_client.post(TITLES_URL, data=payload,
+                                     format='json')
+        assert response.status_code == 207, (
+            'Проверьте, что повтор названия не роняет всю пачку'
+        )
+        results = response.json()
+        assert [item['status'] for item in results] == [201, 400, 201, 400]
+        assert 'name' in results[1]['errors']
+        assert 'name' in results[3]['errors']
+        assert Title.objects.filter(name__in=['Alpha', 'Beta']).count() == 2
+
+    def test_titles_batch_resolves_slugs_once(self, admin_client, genres,
+                                              category):
+        payload = [{'name': f'Title {i}', 'year': 2000,
+                    'category': category.slug,
+                    'genre': [genre.slug for genre in genres]}
+                   for i in range(20)]
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.post(TITLES_URL, data=payload,
+                                         format='json')
+        assert response.status_code == 201
+        lookups = [q['sql'] for q in queries if q['sql'].startswith('SELECT')
+                   and ('"api_genre"' in q['sql']
+                        or '"api_category"' in q['sql'])]
+        assert len(lookups) == 2, (
+            'Проверьте, что жанры и категории пачки загружаются одним '
+            'запросом на модель'
+        )
+
+    def test_batch_size_limit(self, admin_client, settings):
+        settings.BATCH_CREATE_MAX_ITEMS = 2
+        response = admin_client.post(
+            TITLES_URL, data=[{'name': str(i)} for i in range(3)],
+            format='json'
+        )
+        assert response.status_code == 413
+        assert not Title.objects.exists()
+
+    def test_reviews_batch(self, admin_client, user_client, title, user,
+                           another_user, admin):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        Review.objects.create(title=title, author=admin, text='a', score=1)
+        payload = [
+            {'author': user.username, 'text': 'b', 'score': 4},
+            {'author': another_user.username, 'text': 'c', 'score': 8},
+            {'author': user.username, 'text': 'd', 'score': 2},
+            {'author': admin.username, 'text': 'e', 'score': 2},
+            {'author': 'nobody', 'text': 'f', 'score': 2},
+        ]
+        response = user_client.post(url, data=payload, format='json')
+        assert response.status_code == 403, (
+            'Проверьте, что пакетная загрузка ревью доступна только '
+            'администратору'
+        )
+        response = admin_client.post(url, data=payload, format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [item['status'] for item in results] == [201, 201, 400,
+                                                         400, 400]
+        assert results[0]['data']['author'] == user.username
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (13, 3), (
+            'Проверьте, что пакетное создание ревью обновляет рейтинг'
+        )
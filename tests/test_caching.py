@@ -0,0 +1,118 @@
+import gzip
+import threading
+import time
+
+import pytest
+
+from api.cache_backends import AtomicFileBasedCache
+from api.caching import single_flight
+from api.models import Genre
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_hit_after_miss(self, client, genres):
+        first = client.get('/api/v1/genres/')
+        second = client.get('/api/v1/genres/')
+        assert first['X-Cache'] == 'MISS'
+        assert second['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный GET отдаётся из кеша'
+        )
+        assert second.json() == first.json()
+
+    def test_write_invalidates(self, client, admin_client, genres):
+        client.get('/api/v1/genres/')
+        admin_client.post('/api/v1/genres/', {'name': 'Новый',
+                                              'slug': 'new'})
+        response = client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись в Genre делает кеш устаревшим'
+        )
+        assert response.json()['count'] == len(genres) + 1
+
+    def test_review_invalidates_titles(self, client, title, user):
+        client.get(f'/api/v1/titles/{title.id}/')
+        title.reviews.create(author=user, text='Текст', score=10)
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['rating'] == 10
+
+    def test_compressed_body(self, client, genres):
+        client.get('/api/v1/genres/')
+        response = client.get('/api/v1/genres/',
+                              HTTP_ACCEPT_ENCODING='gzip, br')
+        assert response['Content-Encoding'] == 'gzip'
+        assert b'genre-0' in gzip.decompress(response.content)
+        assert 'Accept-Encoding' in response['Vary']
+
+    def test_cache_is_not_shared_between_filters(self, client):
+        Genre.objects.create(name='Drama', slug='drama')
+        Genre.objects.create(name='Comedy', slug='comedy')
+        client.get('/api/v1/genres/?search=Drama')
+        response = client.get('/api/v1/genres/?search=Comedy')
+        assert [item['slug'] for item in response.json()['results']] == [
+            'comedy'
+        ]
+
+
+class TestAtomicFileBasedCache:
+
+    def test_add_is_atomic(self, tmp_path):
+        cache = AtomicFileBasedCache(str(tmp_path), {})
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.add('lock', 1, 60))
+            )
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results.count(True) == 1, (
+            'Проверьте, что add() берёт ключ ровно один раз'
+        )
+        cache.set('expired', 1, -1)
+        assert cache.add('expired', 2, 60)
+        assert cache.get('expired') == 2
+
+    def test_no_culling(self, tmp_path):
+        cache = AtomicFileBasedCache(
+            str(tmp_path), {'OPTIONS': {'MAX_ENTRIES': 2}}
+        )
+        for number in range(10):
+            cache.set(f'api:version:{number}', number, None)
+        assert all(cache.get(f'api:version:{number}') == number
+                   for number in range(10)), (
+            'Проверьте, что ключи версий не вытесняются'
+        )
+
+
+class TestSingleFlight:
+
+    def test_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    single_flight('test:single-flight', compute, 60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ['value'] * 5
+        assert len(calls) == 1, (
+            'Проверьте, что одновременные промахи вычисляют ответ один раз'
+        )
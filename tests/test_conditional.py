@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Review, Title
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_reviews_not_modified(self, client, title, review):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что совпавший If-None-Match возвращает 304'
+        )
+        assert len(context.captured_queries) == 1, (
+            'Проверьте, что 304 строится без сериализации страницы'
+        )
+
+    def test_new_and_edited_reviews_change_etag(self, client, title, review,
+                                               another_user):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+        Review.objects.create(title=title, author=another_user, text='Ещё',
+                              score=1)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        etag = response['ETag']
+        review.text = 'Исправленный текст'
+        review.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что правка ревью меняет ETag коллекции'
+        )
+
+    def test_comments_if_modified_since(self, client, title, review,
+                                        comment):
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        last_modified = client.get(url)['Last-Modified']
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+    def test_titles_not_modified_without_queries(self, client, title):
+        etag = client.get('/api/v1/titles/')['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/',
+                                  HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert not context.captured_queries, (
+            'Проверьте, что ETag списка произведений строится из версий'
+        )
+
+    def test_deleted_parent_not_modified_is_404(self, client, title, review,
+                                                category):
+        # Пустые коллекции: удаление родителя не меняет их версий.
+        empty = Title.objects.create(name='Без ревью', category=category)
+        reviews = f'/api/v1/titles/{empty.id}/reviews/'
+        comments = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        reviews_etag = client.get(reviews)['ETag']
+        comments_etag = client.get(comments)['ETag']
+        empty.delete()
+        Review.objects.filter(pk=review.pk).delete()
+        assert client.get(
+            reviews, HTTP_IF_NONE_MATCH=reviews_etag
+        ).status_code == 404, (
+            'Проверьте, что ревью удалённого произведения дают 404, а не 304'
+        )
+        assert client.get(
+            comments, HTTP_IF_NONE_MATCH=comments_etag
+        ).status_code == 404
+
+    def test_username_change_changes_etag(self, client, title, review,
+                                          comment, user):
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        comments = f'{reviews}{review.id}/comments/'
+        reviews_etag = client.get(reviews)['ETag']
+        comments_etag = client.get(comments)['ETag']
+        user.username = 'renamed'
+        user.save()
+        response = client.get(reviews, HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == 200, (
+            'Проверьте, что смена username автора меняет ETag ревью'
+        )
+        assert response.json()['results'][0]['author'] == 'renamed'
+        response = client.get(comments, HTTP_IF_NONE_MATCH=comments_etag)
+        assert response.status_code == 200
@@ -0,0 +1,64 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Review, Title
+
+URL = '/api/v1/titles/export/'
+
+
+def _read(response):
+    body = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in body.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_export_rows(self, admin_client, title, review, genres,
+                         category):
+        response = admin_client.get(URL)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        assert _read(response) == [{
+            'id': title.id,
+            'name': title.name,
+            'rating': review.score,
+            'description': title.description,
+            'year': title.year,
+            'genre': [{'name': genre.name, 'slug': genre.slug}
+                      for genre in genres[:2]],
+            'category': {'name': category.name, 'slug': category.slug},
+        }], 'Проверьте, что выгрузка совпадает с форматом списка'
+
+    def test_export_admin_only(self, user_client, client):
+        assert user_client.get(URL).status_code == 403
+        assert client.get(URL).status_code == 401
+
+    def test_export_queries_per_chunk(self, admin_client, settings, genres):
+        settings.EXPORT_CHUNK_SIZE = 2
+        for i in range(5):
+            Title.objects.create(name=f'T{i}').genre.set(genres)
+        with CaptureQueriesContext(connection) as queries:
+            rows = _read(admin_client.get(URL))
+        assert [row['id'] for row in rows] == sorted(
+            Title.objects.values_list('id', flat=True)
+        )
+        assert all(len(row['genre']) == 3 for row in rows)
+        # Пользователь, произведения и по запросу жанров на каждую пачку.
+        assert len(queries) == 1 + 1 + 3, (
+            'Проверьте, что жанры подгружаются одним запросом на пачку'
+        )
+
+    def test_export_command(self, title, user):
+        Review.objects.create(title=title, author=user, text='a', score=6)
+        out = StringIO()
+        call_command('export_titles', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [(row['id'], row['rating']) for row in rows] == [
+            (title.id, 6)
+        ]
@@ -0,0 +1,54 @@
+import pytest
+
+from api.models import Title
+
+
+def _counts(buckets, key='slug'):
+    return {bucket[key]: bucket['count'] for bucket in buckets}
+
+
+@pytest.fixture
+def catalog(title, genres, category):
+    """title: 2000, жанры 0 и 1; other: 2001, 1 и 2; bare: без всего."""
+    other = Title.objects.create(name='Другое', year=2001,
+                                 category=category)
+    other.genre.set(genres[1:])
+    Title.objects.create(name='Без жанра')
+    return title, other
+
+
+@pytest.mark.django_db
+class TestFacets:
+
+    def test_counts(self, client, catalog):
+        response = client.get('/api/v1/titles/facets/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 3
+        assert _counts(data['genre']) == {
+            'genre-0': 1, 'genre-1': 2, 'genre-2': 1
+        }, 'Проверьте, что фасеты считают произведения каждого жанра'
+        assert _counts(data['category']) == {'film': 2}
+        assert _counts(data['year'], 'year') == {2000: 1, 2001: 1}
+
+    def test_counts_follow_filters(self, client, catalog):
+        response = client.get('/api/v1/titles/facets/?genre=genre-2')
+        data = response.json()
+        assert data['count'] == 1
+        assert _counts(data['genre']) == {
+            'genre-0': 0, 'genre-1': 1, 'genre-2': 1
+        }, 'Проверьте, что фасеты учитывают фильтры списка'
+        assert _counts(data['year'], 'year') == {2001: 1}
+        response = client.get('/api/v1/titles/facets/?genre_mode=x')
+        assert response.status_code == 400
+
+    def test_query_count_is_flat(self, client, catalog, genres,
+                                 django_assert_max_num_queries):
+        client.get('/api/v1/titles/facets/?year=2000')
+        Title.objects.bulk_create([
+            Title(name=f'Ещё {number}', year=1900 + number)
+            for number in range(30)
+        ])
+        with django_assert_max_num_queries(6):
+            response = client.get('/api/v1/titles/facets/?name=Ещё')
+        assert response.json()['count'] == 30
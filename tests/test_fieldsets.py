@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def _get(client, path):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(path)
+    assert response.status_code == 200, response.content
+    return response.json(), [query['sql'] for query in queries]
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+
+    def test_title_fields(self, client, title, review):
+        data, queries = _get(client, '/api/v1/titles/?fields=id,name,rating')
+        assert data['results'] == [
+            {'id': title.pk, 'name': 'Произведение', 'rating': 7}
+        ], 'Проверьте, что ?fields= оставляет только перечисленные поля'
+        sql = ' '.join(queries)
+        assert 'description' not in sql, (
+            'Проверьте, что ненужные столбцы не читаются из БД'
+        )
+        assert 'api_category' not in sql and 'api_genre' not in sql, (
+            'Проверьте, что JOIN и prefetch для выброшенных связей '
+            'не выполняются'
+        )
+
+    def test_title_omit(self, client, title):
+        data, queries = _get(client, f'/api/v1/titles/{title.pk}/'
+                                     '?omit=description,genre')
+        assert set(data) == {'id', 'name', 'rating', 'year', 'category'}
+        assert data['category']['slug'] == 'film'
+        assert not any('api_genre' in sql for sql in queries)
+
+    def test_review_and_comment(self, client, title, review, comment):
+        data, queries = _get(client, f'/api/v1/titles/{title.pk}/reviews/'
+                                     '?fields=id,score')
+        assert data['results'] == [{'id': review.pk, 'score': 7}]
+        assert not any('"api_review"."text"' in sql for sql in queries)
+        assert not any('api_user' in sql for sql in queries), (
+            'Проверьте, что автор не подтягивается, если его нет в ?fields='
+        )
+        data, queries = _get(
+            client,
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+            '?omit=text'
+        )
+        assert set(data['results'][0]) == {'id', 'author', 'pub_date'}
+        assert not any('"api_comment"."text"' in sql for sql in queries)
+
+    def test_unknown_field(self, client, title):
+        response = client.get('/api/v1/titles/?fields=id,secret')
+        assert response.status_code == 400
+        assert 'fields' in response.json()
@@ -0,0 +1,108 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.caching import bump_version
+from api.genre_index import count_of, genre_index, ids_of, mask_of
+from api.models import Title
+
+
+def _names(client, query):
+    response = client.get(f'/api/v1/titles/?{query}')
+    assert response.status_code == 200, response.content
+    return sorted(item['name'] for item in response.json()['results'])
+
+
+@pytest.fixture
+def other(title, genres, category):
+    """title: жанры 0 и 1, other: жанры 1 и 2."""
+    other = Title.objects.create(name='Другое', year=2001,
+                                 category=category)
+    other.genre.set(genres[1:])
+    return other
+
+
+class TestMasks:
+
+    def test_round_trip(self):
+        ids = [1, 7, 8, 63, 64, 1000]
+        assert ids_of(mask_of(ids)) == ids
+        assert ids_of(0) == []
+        assert count_of(mask_of(ids)) == len(ids)
+        assert count_of(0) == 0
+
+
+@pytest.mark.django_db
+class TestGenreFilter:
+
+    def test_any_and_all(self, client, other):
+        assert _names(client, 'genre=genre-0,genre-2') == [
+            'Другое', 'Произведение'
+        ], 'Проверьте, что по умолчанию ?genre= ищет любой из жанров'
+        assert _names(client, 'genre=genre-1,genre-2&genre_mode=all') == [
+            'Другое'
+        ], 'Проверьте, что genre_mode=all ищет произведения со всеми жанрами'
+        assert _names(client, 'genre=genre-0,genre-2&genre_mode=all') == []
+        assert _names(client, 'genre=genre-1') == ['Другое', 'Произведение']
+        assert _names(client, 'genre=unknown') == []
+
+    def test_invalid_mode(self, client, other):
+        response = client.get('/api/v1/titles/?genre=genre-1&genre_mode=x')
+        assert response.status_code == 400
+
+    def test_orm_fallback_matches(self, client, other, settings):
+        queries = ['genre=genre-0,genre-2', 'genre=genre-1,genre-2'
+                   '&genre_mode=all', 'genre=genre-0,genre-1&genre_mode=all']
+        expected = [_names(client, query) for query in queries]
+        settings.GENRE_INDEX_ENABLED = False
+        assert [_names(client, query) for query in queries] == expected, (
+            'Проверьте, что индекс и ORM находят одни и те же произведения'
+        )
+
+    def test_large_match_falls_back_to_orm(self, client, other, settings):
+        settings.GENRE_INDEX_MAX_IDS = 1
+        with CaptureQueriesContext(connection) as queries:
+            names = _names(client, 'genre=genre-1')
+        assert names == ['Другое', 'Произведение']
+        assert any('api_title_genre' in query['sql']
+                   and 'json_each' not in query['sql']
+                   for query in queries), (
+            'Проверьте, что выше GENRE_INDEX_MAX_IDS фильтр идёт через ORM'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            assert _names(client, 'genre=genre-0') == ['Произведение']
+        assert any('json_each' in query['sql'] for query in queries)
+
+    def test_rebuilds_after_change(self, client, other, genres):
+        assert _names(client, 'genre=genre-2') == ['Другое']
+        other.genre.remove(genres[2])
+        assert _names(client, 'genre=genre-2') == [], (
+            'Проверьте, что индекс перестраивается после изменения жанров'
+        )
+
+    def test_apply_updates_fresh_index(self, title, other, genres):
+        genre_index.build()
+        genre_index.apply('add', [title.pk], [genres[2].pk], fresh=True)
+        assert genre_index.is_fresh()
+        assert ids_of(genre_index.match(['genre-2'], 'all')) == sorted(
+            [title.pk, other.pk]
+        )
+        genre_index.apply('remove', [other.pk], None, fresh=True)
+        assert ids_of(genre_index.match(['genre-1', 'genre-2'], 'any')) == [
+            title.pk
+        ]
+        bump_version('title_genre')
+        assert not genre_index.is_fresh()
+
+    def test_benchmark_command(self, capsys):
+        call_command('benchmark_genre_filter', '--titles', '200',
+                     '--queries', '3')
+        out = capsys.readouterr().out
+        assert 'index build' in out
+        assert 'GENRE_INDEX_MAX_IDS=' in out, (
+            'Проверьте, что benchmark_genre_filter печатает лимит id'
+        )
+        assert not Title.objects.exists(), (
+            'Проверьте, что benchmark_genre_filter откатывает данные'
+        )
@@ -0,0 +1,151 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from api.caching import get_versions
+from api.importers import import_file
+from api.models import Category, Comment, Genre, Review, Title
+
+
+def _write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.django_db
+class TestImportData:
+
+    def test_import_catalogue(self, tmp_path, user, another_user):
+        call_command('import_data', 'category', _write(
+            tmp_path / 'category.csv',
+            'id,name,slug\n1,Фильм,film\n2,Книга,book\n'
+        ))
+        call_command('import_data', 'genre', _write(
+            tmp_path / 'genre.jsonl',
+            '{"name": "Drama", "slug": "drama"}\n'
+            '{"name": "Comedy", "slug": "comedy"}\n'
+        ))
+        call_command('import_data', 'title', _write(
+            tmp_path / 'titles.csv',
+            'id,name,year,category,genre\n'
+            '10,Alpha,1999,film,"drama,comedy"\n'
+            '11,Beta,2001,2,\n'
+            '12,Gamma,2002,missing,\n'
+        ))
+        assert Category.objects.count() == 2
+        assert Genre.objects.count() == 2
+        assert set(Title.objects.values_list('id', flat=True)) == {10, 11}, (
+            'Проверьте, что строка с неизвестной категорией пропускается'
+        )
+        alpha = Title.objects.get(pk=10)
+        assert alpha.category.slug == 'film'
+        assert set(alpha.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }, 'Проверьте, что жанры произведения создаются по slug'
+
+        call_command('import_data', 'review', _write(
+            tmp_path / 'review.jsonl',
+            json.dumps({'title_id': 10, 'author': user.username,
+                        'text': 'a', 'score': 4,
+                        'pub_date': '2020-01-01T00:00:00Z'}) + '\n'
+            + json.dumps({'title_id': 10, 'author': another_user.id,
+                          'text': 'b', 'score': 8}) + '\n'
+            + 'не json\n'
+        ))
+        alpha.refresh_from_db()
+        assert (alpha.rating_sum, alpha.rating_count) == (12, 2), (
+            'Проверьте, что импорт ревью пересчитывает рейтинг'
+        )
+        review = Review.objects.get(author=user)
+        assert review.pub_date.year == 2020, (
+            'Проверьте, что дата ревью берётся из файла'
+        )
+        assert Review._meta.get_field('pub_date').auto_now_add, (
+            'Проверьте, что импорт не меняет auto_now_add у модели'
+        )
+        created = Title.objects.create(name='Delta', year=2000)
+        assert created.pk > 11, (
+            'Проверьте, что после импорта с id сбрасывается sequence'
+        )
+
+    def test_import_bumps_versions(self, tmp_path):
+        before = get_versions(['genre'])
+        import_file(_write(tmp_path / 'genre.csv', 'name,slug\nA,a\n'),
+                    'genre')
+        assert get_versions(['genre']) != before, (
+            'Проверьте, что импорт сбрасывает кеш ответов'
+        )
+
+    def test_malformed_jsonl_rows_are_reported(self, tmp_path, capsys):
+        path = _write(
+            tmp_path / 'genre.jsonl',
+            '{"name": "Drama", "slug": "drama"}\n'
+            '{"name": "Broken"\n'
+            '["list", "row"]\n'
+            '\n'
+            '{"name": "Comedy", "slug": "comedy"}\n'
+        )
+        importer = import_file(path, 'genre')
+        assert (importer.imported, importer.skipped, importer.invalid) == (
+            2, 0, 2
+        ), 'Проверьте, что битые строки JSONL считаются отдельно'
+        assert [error.split(':')[0] for error in importer.errors] == [
+            'byte 35', 'byte 53'
+        ], 'Проверьте, что в отчёте указано смещение битой строки'
+        call_command('import_data', 'genre', path)
+        captured = capsys.readouterr()
+        assert 'invalid=2' in captured.out
+        assert 'invalid row at byte 35: не JSON' in captured.err
+
+    def test_resumable_comment_import_needs_ids(self, tmp_path, review,
+                                                user):
+        rows = [{'review_id': review.pk, 'author': user.username,
+                 'text': f'Комментарий {number}'} for number in range(3)]
+        path = _write(tmp_path / 'comment.jsonl', ''.join(
+            json.dumps(row) + '\n' for row in rows
+        ))
+        checkpoint = str(tmp_path / 'comment.checkpoint')
+        importer = import_file(path, 'comment', checkpoint=checkpoint)
+        assert (importer.imported, importer.invalid) == (0, 3), (
+            'Проверьте, что комментарии без id не импортируются с '
+            'checkpoint: повтор пачки задвоил бы их'
+        )
+        path = _write(tmp_path / 'comment.jsonl', ''.join(
+            json.dumps({'id': 100 + number, **row}) + '\n'
+            for number, row in enumerate(rows)
+        ))
+        for _ in range(2):
+            import_file(path, 'comment', batch_size=2,
+                        checkpoint=checkpoint)
+        assert Comment.objects.count() == 3, (
+            'Проверьте, что повтор импорта комментариев с id не создаёт '
+            'дублей'
+        )
+        call_command('import_data', 'comment', '--no-checkpoint', _write(
+            tmp_path / 'more.jsonl', json.dumps(rows[0]) + '\n'
+        ))
+        assert Comment.objects.count() == 4
+
+    def test_resume_from_checkpoint(self, tmp_path):
+        path = _write(tmp_path / 'genre.csv', 'name,slug\n' + ''.join(
+            f'Genre {i},genre-{i}\n' for i in range(5)
+        ))
+        checkpoint = str(tmp_path / 'genre.checkpoint')
+        done = []
+
+        def fail(rows, importer):
+            done.append(rows)
+            raise RuntimeError('сбой после первой пачки')
+
+        with pytest.raises(RuntimeError):
+            import_file(path, 'genre', batch_size=2,
+                        checkpoint=checkpoint, progress=fail)
+        assert Genre.objects.count() == 2
+        importer = import_file(path, 'genre', batch_size=2,
+                               checkpoint=checkpoint, resume=True)
+        assert importer.imported == 3, (
+            'Проверьте, что импорт продолжается с места сбоя'
+        )
+        assert Genre.objects.count() == 5
+        assert not (tmp_path / 'genre.checkpoint').exists()
@@ -0,0 +1,132 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.leaderboards import _insert_rankings, refresh_rankings
+from api.models import Review, Title, TitleRanking
+
+
+def _board(board):
+    return list(TitleRanking.objects.filter(board=board)
+                .values_list('title_id', 'votes'))
+
+
+def _voters(django_user_model, count):
+    return [
+        django_user_model.objects.create(username=f'voter{i}',
+                                         email=f'voter{i}@yamdb.fake')
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def rated(title, genres, category, django_user_model):
+    """title: много девяток, lucky: одна десятка."""
+    lucky = Title.objects.create(name='Одна оценка', year=2010,
+                                 category=category)
+    lucky.genre.set(genres[1:])
+    voters = _voters(django_user_model, 20)
+    for voter in voters:
+        Review.objects.create(title=title, author=voter, text='t', score=9)
+    Review.objects.create(title=lucky, author=voters[0], text='t', score=10)
+    return title, lucky
+
+
+@pytest.mark.django_db
+class TestLeaderboards:
+
+    def test_weighted_score_ranks_many_votes_higher(self, client, rated):
+        title, lucky = rated
+        response = client.get('/api/v1/leaderboards/')
+        assert response.status_code == 200
+        data = response.json()
+        assert [row['title']['id'] for row in data] == [title.id, lucky.id], (
+            'Проверьте, что одна высокая оценка не поднимает произведение '
+            'выше произведения с многими оценками'
+        )
+        assert data[0]['votes'] == 20
+        assert data[0]['title']['rating'] == 9
+        assert data[0]['score'] > data[1]['score']
+
+    def test_genre_category_and_year_boards(self, client, rated, genres):
+        title, lucky = rated
+        response = client.get(f'/api/v1/leaderboards/genres/{genres[0].slug}/')
+        assert [row['title']['id'] for row in response.json()] == [title.id]
+        response = client.get(f'/api/v1/leaderboards/genres/{genres[2].slug}/')
+        assert [row['title']['id'] for row in response.json()] == [lucky.id]
+        response = client.get('/api/v1/leaderboards/categories/film/')
+        assert len(response.json()) == 2
+        response = client.get('/api/v1/leaderboards/years/2010/')
+        assert [row['title']['id'] for row in response.json()] == [lucky.id]
+        response = client.get('/api/v1/leaderboards/genres/unknown/')
+        assert response.status_code == 404
+
+    def test_limit(self, client, rated):
+        response = client.get('/api/v1/leaderboards/?limit=1')
+        assert len(response.json()) == 1
+        response = client.get('/api/v1/leaderboards/?limit=abc')
+        assert response.status_code == 400
+
+    def test_incremental_refresh(self, rated, genres, another_user):
+        title, lucky = rated
+        review = Review.objects.create(title=lucky, author=another_user,
+                                       text='t', score=2)
+        assert _board('all')[1] == (lucky.id, 2), (
+            'Проверьте, что новое ревью обновляет место произведения'
+        )
+        review.delete()
+        assert _board('all')[1] == (lucky.id, 1)
+        lucky.genre.remove(genres[2])
+        assert _board(f'genre:{genres[2].id}') == [], (
+            'Проверьте, что смена жанров обновляет доски жанров'
+        )
+        lucky.refresh_from_db()
+        lucky.year = 2011
+        lucky.save()
+        assert _board('year:2011') == [(lucky.id, 1)]
+        assert _board('year:2010') == []
+        genres[1].delete()
+        assert _board(f'genre:{genres[1].id}') == []
+        lucky.delete()
+        assert _board('all') == [(title.id, 20)], (
+            'Проверьте, что удаление произведения убирает его из рейтинга'
+        )
+
+    def test_rebuild_command_matches_incremental(self, rated):
+        incremental = sorted(TitleRanking.objects.values_list(
+            'board', 'title_id', 'score', 'votes'
+        ))
+        TitleRanking.objects.all().delete()
+        call_command('rebuild_leaderboards')
+        rebuilt = sorted(TitleRanking.objects.values_list(
+            'board', 'title_id', 'score', 'votes'
+        ))
+        assert rebuilt == incremental, (
+            'Проверьте, что rebuild_leaderboards строит те же места'
+        )
+
+    def test_overlapping_refresh(self, rated):
+        title, lucky = rated
+        expected = sorted(TitleRanking.objects.values_list(
+            'board', 'title_id', 'score', 'votes'
+        ))
+        refresh_rankings([title.id, lucky.id])
+        refresh_rankings([lucky.id, title.id, lucky.id])
+        # Вставка поверх строк, уже вставленных параллельным пересчётом.
+        _insert_rankings(connection, [title.id, lucky.id])
+        assert sorted(TitleRanking.objects.values_list(
+            'board', 'title_id', 'score', 'votes'
+        )) == expected, (
+            'Проверьте, что повторный пересчёт не падает на '
+            'unique_ranking_title и не дублирует строки'
+        )
+
+    def test_top_n_query_count(self, client, rated):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/leaderboards/categories/film/')
+        assert response.status_code == 200
+        # Категория по slug, строки рейтинга с произведением и жанры.
+        assert len(queries) <= 3, (
+            'Проверьте, что топ читается без запросов на каждое произведение'
+        )
@@ -0,0 +1,113 @@
+import json
+import os
+import re
+
+import pytest
+
+from api.metrics import MetricsStore, archive_worker, collect, store
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    store.clear()
+    yield tmp_path
+    store.clear()
+
+
+def _value(body, line_start):
+    for line in body.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_metrics_endpoint(self, client, metrics_dir, title):
+        client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{title.id}/')
+        client.get('/api/v1/titles/')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        body = response.content.decode()
+        labels = '{method="GET",route="api/v1/titles/"'
+        assert _value(
+            body, f'yamdb_http_requests_total{labels},status="200"}}'
+        ) == 2, 'Проверьте, что запросы считаются по маршруту и статусу'
+        assert _value(
+            body, 'yamdb_http_requests_total{method="GET",'
+                  'route="api/v1/titles/{pk}/",status="200"}'
+        ) == 1
+        assert _value(
+            body, f'yamdb_http_request_duration_seconds_count{labels}}}'
+        ) == 2
+        assert _value(
+            body,
+            f'yamdb_http_request_duration_seconds_bucket{labels},le="+Inf"}}'
+        ) == 2
+        assert _value(body, f'yamdb_db_queries_total{labels}}}') > 0, (
+            'Проверьте, что считаются SQL-запросы маршрута'
+        )
+        assert _value(
+            body, f'yamdb_http_response_size_bytes_sum{labels}}}'
+        ) > 0
+        assert re.search(r'yamdb_auth_user_cache_total\{result="hits"\}',
+                         body)
+
+    def test_metrics_summed_across_processes(self, client, metrics_dir):
+        client.get('/api/v1/genres/')
+        (metrics_dir / '1.json').write_text(json.dumps({
+            'counters': [['yamdb_http_requests_total',
+                          {'method': 'GET', 'route': 'api/v1/genres/',
+                           'status': '200'}, 5]],
+            'histograms': [],
+        }))
+        body = client.get('/metrics').content.decode()
+        assert _value(
+            body, 'yamdb_http_requests_total{method="GET",'
+                  'route="api/v1/genres/",status="200"}'
+        ) == 6, 'Проверьте, что метрики всех процессов складываются'
+
+    def test_dead_worker_gauges_dropped(self, metrics_dir):
+        dead = 2 ** 30
+        stale = {
+            'counters': [
+                ['yamdb_http_requests_total',
+                 {'method': 'GET', 'route': 'api/v1/genres/',
+                  'status': '200'}, 4],
+                ['yamdb_auth_user_cache_size', {}, 100],
+            ],
+            'histograms': [],
+        }
+        (metrics_dir / f'{dead}.json').write_text(json.dumps(stale))
+        requests = ('yamdb_http_requests_total',
+                    (('method', 'GET'), ('route', 'api/v1/genres/'),
+                     ('status', '200')))
+        size = ('yamdb_auth_user_cache_size', ())
+        counters, _ = collect()
+        assert counters[requests] == 4
+        assert counters[size] < 100, (
+            'Проверьте, что gauge умерших процессов не складываются'
+        )
+        archive_worker(dead)
+        assert not (metrics_dir / f'{dead}.json').exists()
+        counters, _ = collect()
+        assert counters[requests] == 4, (
+            'Проверьте, что счётчики умершего воркера остаются в архиве'
+        )
+
+    def test_reused_pid_keeps_counters(self, metrics_dir):
+        (metrics_dir / f'{os.getpid()}.json').write_text(json.dumps({
+            'counters': [['yamdb_db_queries_total',
+                          {'method': 'GET', 'route': 'x'}, 3]],
+            'histograms': [],
+        }))
+        MetricsStore().flush(force=True)
+        counters, _ = collect()
+        assert counters[('yamdb_db_queries_total',
+                         (('method', 'GET'), ('route', 'x')))] == 3, (
+            'Проверьте, что новый процесс с тем же pid не затирает счётчики'
+        )
@@ -0,0 +1,104 @@
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+
+from api.models import OutboxEmail, OutboxStatusChoices
+
+
+class FailingEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class RefusingEmailBackend(BaseEmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP отверг соединение')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('send_messages без соединения')
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_registration_enqueues_mail(self, client):
+        response = client.post('/api/v1/auth/email/',
+                               {'email': 'new@yamdb.fake',
+                                'username': 'new'})
+        assert response.status_code == 201
+        assert not mail.outbox, (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        email = OutboxEmail.objects.get()
+        assert email.to == 'new@yamdb.fake'
+        assert email.status == OutboxStatusChoices.PENDING
+
+    def test_worker_sends_batch(self, client):
+        for number in range(3):
+            client.post('/api/v1/auth/email/',
+                        {'email': f'new{number}@yamdb.fake',
+                         'username': f'new{number}'})
+        call_command('send_outbox', '--once')
+        assert len(mail.outbox) == 3
+        assert not OutboxEmail.objects.exclude(
+            status=OutboxStatusChoices.SENT
+        ).exists()
+        assert not OutboxEmail.objects.exclude(body='').exists(), (
+            'Проверьте, что код подтверждения не остаётся в БД после отправки'
+        )
+
+    def test_failed_send_is_retried_later(self, client, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.FailingEmailBackend'
+        client.post('/api/v1/auth/email/',
+                    {'email': 'new@yamdb.fake', 'username': 'new'})
+        call_command('send_outbox', '--once')
+        email = OutboxEmail.objects.get()
+        assert email.status == OutboxStatusChoices.PENDING
+        assert email.attempts == 1
+        assert email.next_attempt_at > email.created_at, (
+            'Проверьте, что неудачная отправка откладывается с задержкой'
+        )
+        assert 'SMTP' in email.last_error
+        call_command('send_outbox', '--once')
+        email.refresh_from_db()
+        assert email.attempts == 1, (
+            'Проверьте, что письмо не отправляется раньше срока'
+        )
+
+    def test_connection_failure_is_retried_later(self, client, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.RefusingEmailBackend'
+        for number in range(2):
+            client.post('/api/v1/auth/email/',
+                        {'email': f'new{number}@yamdb.fake',
+                         'username': f'new{number}'})
+        call_command('send_outbox', '--once')
+        for email in OutboxEmail.objects.all():
+            assert email.status == OutboxStatusChoices.PENDING
+            assert email.attempts == 1, (
+                'Проверьте, что сбой соединения засчитывается как попытка'
+            )
+            assert email.next_attempt_at > email.created_at
+            assert 'SMTP' in email.last_error
+
+    def test_worker_survives_errors(self, monkeypatch):
+        from api.management.commands import send_outbox
+        command = send_outbox.Command()
+        calls = []
+
+        def fail(batch_size):
+            calls.append(batch_size)
+            if len(calls) > 1:
+                command.running = False
+            raise ConnectionError('БД недоступна')
+
+        monkeypatch.setattr(send_outbox, 'send_batch', fail)
+        monkeypatch.setattr(send_outbox.time, 'sleep', lambda seconds: None)
+        monkeypatch.setattr(send_outbox.signal, 'signal',
+                            lambda *args: None)
+        command.handle(stats=False, once=False, batch_size=10, interval=1)
+        assert len(calls) == 2, (
+            'Проверьте, что воркер продолжает работу после ошибки'
+        )
@@ -0,0 +1,43 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Review, User
+
+
+@pytest.fixture
+def reviews(title):
+    authors = [User.objects.create(username=f'author{i}',
+                                   email=f'author{i}@yamdb.fake')
+               for i in range(15)]
+    return [Review.objects.create(title=title, author=author, text='Текст',
+                                  score=5)
+            for author in authors]
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_page_number_is_default(self, client, title, reviews):
+        response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.json()['count'] == len(reviews), (
+            'Проверьте, что постраничная пагинация остаётся по умолчанию'
+        )
+
+    def test_cursor_pages_are_stable(self, client, title, reviews, admin):
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        with CaptureQueriesContext(connection) as context:
+            first = client.get(url).json()
+        assert 'count' not in first
+        assert not any('COUNT' in query['sql']
+                       for query in context.captured_queries), (
+            'Проверьте, что курсорный режим не выполняет COUNT'
+        )
+        Review.objects.create(title=title, author=admin, text='Новое',
+                              score=1)
+        second = client.get(first['next']).json()
+        ids = [item['id'] for item in first['results'] + second['results']]
+        assert ids == sorted((r.id for r in reviews), reverse=True), (
+            'Проверьте, что новые записи не сдвигают курсорные страницы'
+        )
+        assert second['next'] is None
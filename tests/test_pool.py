@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+from django.db.utils import ConnectionHandler
+
+from api_yamdb.backends.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    opened = 0
+
+    def __init__(self):
+        FakeConnection.opened += 1
+        self.alive = True
+
+    def close(self):
+        self.alive = False
+
+
+def ping(connection):
+    if not connection.alive:
+        raise ConnectionError('закрыто')
+
+
+class TestConnectionPool:
+
+    def test_reuses_connections(self):
+        pool = ConnectionPool({'MIN_SIZE': 1, 'MAX_SIZE': 2}, ping=ping)
+        first = pool.checkout(FakeConnection)
+        pool.checkin(first)
+        assert pool.checkout(FakeConnection) is first, (
+            'Проверьте, что пул отдаёт возвращённое соединение'
+        )
+        stats = pool.stats()
+        assert (stats['created'], stats['reused']) == (1, 1)
+        assert (stats['in_use'], stats['idle']) == (1, 0)
+
+    def test_min_size_is_filled(self):
+        pool = ConnectionPool({'MIN_SIZE': 3, 'MAX_SIZE': 5})
+        pool.checkout(FakeConnection)
+        assert pool.stats()['idle'] == 2
+
+    def test_exhausted_pool_times_out(self):
+        pool = ConnectionPool({'MIN_SIZE': 0, 'MAX_SIZE': 1,
+                               'TIMEOUT': 0.05})
+        pool.checkout(FakeConnection)
+        with pytest.raises(PoolTimeout):
+            pool.checkout(FakeConnection)
+        stats = pool.stats()
+        assert stats['exhausted'] == 1 and stats['waits'] == 1
+        assert stats['wait_seconds'] > 0
+
+    def test_waiter_gets_returned_connection(self):
+        pool = ConnectionPool({'MIN_SIZE': 0, 'MAX_SIZE': 1, 'TIMEOUT': 5})
+        connection = pool.checkout(FakeConnection)
+        timer = threading.Timer(0.05, pool.checkin, [connection])
+        timer.start()
+        assert pool.checkout(FakeConnection) is connection
+        timer.join()
+
+    def test_dead_and_stale_connections_replaced(self):
+        pool = ConnectionPool({'MIN_SIZE': 0, 'MAX_SIZE': 2}, ping=ping)
+        connection = pool.checkout(FakeConnection)
+        connection.alive = False
+        pool.checkin(connection)
+        replacement = pool.checkout(FakeConnection)
+        assert replacement is not connection, (
+            'Проверьте, что pre-ping отбрасывает мёртвое соединение'
+        )
+        pool.options['RECYCLE'] = 0.000001
+        pool.checkin(replacement)
+        assert replacement.alive is False, (
+            'Проверьте, что устаревшее соединение закрывается'
+        )
+        stats = pool.stats()
+        assert stats['ping_failures'] == 1 and stats['discarded'] == 2
+        assert stats['size'] == 0
+
+
+@pytest.mark.django_db
+class TestPooledSQLiteBackend:
+
+    def test_connection_returns_to_pool(self, tmp_path):
+        handler = ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.sqlite3',
+                        'NAME': ':memory:'},
+            'pooled': {
+                'ENGINE': 'api_yamdb.backends.pooled_sqlite3',
+                'NAME': str(tmp_path / 'pool.sqlite3'),
+                'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 2},
+            },
+        })
+        wrapper = handler['pooled']
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = wrapper.connection
+        wrapper.close()
+        assert wrapper.connection is None
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert wrapper.connection is raw, (
+            'Проверьте, что после close() соединение берётся из пула'
+        )
+        stats = wrapper.get_pool().stats()
+        assert stats['created'] == 1 and stats['reused'] == 1
+        wrapper.close()
+        wrapper.get_pool().close_all()
@@ -0,0 +1,81 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Category, Comment, Genre, Review, Title, User
+
+# Бюджет SQL-запросов на каждый эндпоинт. Число запросов не должно
+# зависеть от размера страницы: данные ниже заполняют больше одной
+# страницы, и лишний запрос на строку сразу выходит за бюджет.
+QUERY_BUDGET = {
+    '/api/v1/titles/': 3,
+    '/api/v1/titles/{title}/': 2,
+    '/api/v1/titles/{title}/reviews/': 4,
+    '/api/v1/titles/{title}/reviews/{review}/': 3,
+    '/api/v1/titles/{title}/reviews/{review}/comments/': 4,
+    '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/': 3,
+    '/api/v1/genres/': 2,
+    '/api/v1/categories/': 2,
+}
+ADMIN_QUERY_BUDGET = {
+    '/api/v1/users/': 3,
+    '/api/v1/users/{username}/': 2,
+    '/api/v1/users/me/': 1,
+}
+ROWS = 15
+
+
+@pytest.fixture
+def catalogue():
+    genres = [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+              for i in range(ROWS)]
+    categories = [Category.objects.create(name=f'Кат {i}', slug=f'cat-{i}')
+                  for i in range(ROWS)]
+    titles = []
+    for i in range(ROWS):
+        title = Title.objects.create(name=f'Произведение {i}', year=2000,
+                                     category=categories[i])
+        title.genre.set(genres[i:i + 3])
+        titles.append(title)
+    authors = [User.objects.create(username=f'author{i}',
+                                   email=f'author{i}@yamdb.fake')
+               for i in range(ROWS)]
+    reviews = [Review.objects.create(title=titles[0], author=author,
+                                     text='Текст', score=5)
+               for author in authors]
+    comments = [Comment.objects.create(review=reviews[0], author=author,
+                                       text='Текст')
+                for author in authors]
+    return {
+        'title': titles[0].id,
+        'review': reviews[0].id,
+        'comment': comments[0].id,
+        'username': authors[0].username,
+    }
+
+
+def _count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Эндпоинт {url} вернул {response.status_code}'
+    )
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('url,budget', QUERY_BUDGET.items())
+    def test_public_endpoints(self, client, catalogue, url, budget):
+        url = url.format(**catalogue)
+        assert _count_queries(client, url) <= budget, (
+            f'Проверьте, что {url} укладывается в {budget} SQL-запроса'
+        )
+
+    @pytest.mark.parametrize('url,budget', ADMIN_QUERY_BUDGET.items())
+    def test_admin_endpoints(self, admin_client, catalogue, url, budget):
+        url = url.format(**catalogue)
+        assert _count_queries(admin_client, url) <= budget, (
+            f'Проверьте, что {url} укладывается в {budget} SQL-запроса'
+        )
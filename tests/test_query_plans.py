@@ -0,0 +1,48 @@
+import pytest
+from django.core.management import call_command
+
+from api.explain import check_endpoints, explain, seed
+from api.models import Comment, Title
+
+
+def _problems(results):
+    return {
+        name: [(sql, lines) for sql, params, lines, problems in queries
+               if problems]
+        for name, (path, status, queries) in results.items()
+        if any(query[3] for query in queries)
+    }
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    def test_endpoints_use_indexes(self):
+        results = check_endpoints(seed(titles=60))
+        statuses = {name: result[1] for name, result in results.items()}
+        assert set(statuses.values()) == {200}, statuses
+        assert _problems(results) == {}, (
+            'Проверьте, что запросы эндпоинтов читают по индексу без '
+            'полного просмотра таблиц и сортировки'
+        )
+
+    def test_detects_scan_and_sort(self):
+        seed(titles=10)
+        sql, params = (Title.objects.filter(description='x')
+                       .query.sql_with_params())
+        assert explain(sql, params)[1], (
+            'Проверьте, что фильтр без индекса считается проблемой'
+        )
+        sql, params = (Comment.objects.filter(review_id=1)
+                       .order_by('-pub_date').query.sql_with_params())
+        assert explain(sql, params)[1], (
+            'Проверьте, что сортировка без индекса считается проблемой'
+        )
+
+    def test_command(self, capsys):
+        call_command('explain_queries', '--titles', '20')
+        out = capsys.readouterr().out
+        assert 'FAIL' not in out
+        assert not Title.objects.exists(), (
+            'Проверьте, что explain_queries откатывает засеянные данные'
+        )
@@ -0,0 +1,92 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.models import Review, Title
+from api.serializers import TitleWriteSerializer
+
+
+def _stored(title):
+    title.refresh_from_db()
+    return title.rating_sum, title.rating_count
+
+
+@pytest.mark.django_db
+class TestStoredRating:
+
+    def test_review_changes_update_rating(self, title, user, another_user):
+        review = Review.objects.create(
+            title=title, author=user, text='a', score=4
+        )
+        Review.objects.create(
+            title=title, author=another_user, text='b', score=9
+        )
+        assert _stored(title) == (13, 2), (
+            'Проверьте, что создание ревью обновляет сумму и число оценок'
+        )
+        review.score = 6
+        review.save()
+        assert _stored(title) == (15, 2), (
+            'Проверьте, что изменение оценки сдвигает сумму оценок'
+        )
+        review.delete()
+        assert _stored(title) == (9, 1), (
+            'Проверьте, что удаление ревью вычитает его оценку'
+        )
+
+    def test_cascade_delete_updates_rating(self, title, review,
+                                           another_user):
+        Review.objects.create(
+            title=title, author=another_user, text='b', score=3
+        )
+        another_user.delete()
+        assert _stored(title) == (review.score, 1), (
+            'Проверьте, что каскадное удаление автора обновляет рейтинг'
+        )
+        title.delete()
+        assert not Title.objects.exists()
+
+    def test_api_output_matches_average(self, client, title, review,
+                                        another_user):
+        Review.objects.create(
+            title=title, author=another_user, text='b', score=4
+        )
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        assert response.json()['rating'] == int((review.score + 4) / 2), (
+            'Проверьте, что rating равен среднему по ревью'
+        )
+
+    def test_title_without_reviews_has_null_rating(self, client, title):
+        response = client.get('/api/v1/titles/')
+        assert response.json()['results'][0]['rating'] is None
+
+    def test_title_save_keeps_newer_counters(self, title, user,
+                                             another_user):
+        loaded = Title.objects.get(pk=title.pk)
+        Review.objects.create(title=title, author=user, text='a', score=4)
+        loaded.name = 'Новое название'
+        loaded.save()
+        assert _stored(title) == (4, 1), (
+            'Проверьте, что сохранение произведения не сбрасывает счётчики '
+            'оценок, изменённые после его загрузки'
+        )
+        loaded = Title.objects.get(pk=title.pk)
+        Review.objects.create(title=title, author=another_user, text='b',
+                              score=6)
+        serializer = TitleWriteSerializer(loaded, data={'year': 1999},
+                                          partial=True)
+        assert serializer.is_valid(), serializer.errors
+        serializer.save()
+        assert _stored(title) == (10, 2)
+        assert title.name == 'Новое название' and title.year == 1999
+
+    def test_rebuild_command(self, title, review):
+        Title.objects.filter(pk=title.pk).update(rating_sum=1,
+                                                 rating_count=5)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        assert _stored(title) == (review.score, 1), (
+            'Проверьте, что rebuild_ratings восстанавливает рейтинг'
+        )
+        call_command('rebuild_ratings', '--check')
@@ -0,0 +1,60 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.replay import percentile, route_of
+
+
+def _log(tmp_path, records):
+    path = tmp_path / 'traffic.jsonl'
+    path.write_text('\n'.join(
+        record if isinstance(record, str) else json.dumps(record)
+        for record in records
+    ), encoding='utf-8')
+    return str(path)
+
+
+class TestReplayHelpers:
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([7], 0.95) == 7
+
+    def test_route_of(self):
+        assert route_of('get', '/api/v1/titles/5/reviews/?page=2') == (
+            'GET api/v1/titles/{title_id}/reviews/'
+        )
+        assert route_of('GET', '/missing/') == 'GET unresolved'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplayCommand:
+
+    def test_replay(self, tmp_path, title, user):
+        log = _log(tmp_path, [
+            {'method': 'GET', 'path': '/api/v1/titles/'},
+            {'method': 'GET', 'path': f'/api/v1/titles/{title.id}/'},
+            {'method': 'POST', 'path': f'/api/v1/titles/{title.id}/reviews/',
+             'body': {'text': 'Текст', 'score': 5}, 'role': 'user'},
+            {'request_id': 'user-001', 'title': 'не запрос'},
+            'не json',
+        ])
+        output = tmp_path / 'result.json'
+        call_command('replay_requests', log, '--concurrency', '2',
+                     '--output', str(output), stdout=StringIO())
+        result = json.loads(output.read_text())
+        assert result['requests'] == 3
+        assert result['skipped'] == 2, (
+            'Проверьте, что записи без method и path пропускаются'
+        )
+        review = result['routes']['POST api/v1/titles/{title_id}/reviews/']
+        assert review['statuses'] == {'201': 1}, (
+            'Проверьте, что запрос с role идёт от имени пользователя'
+        )
+        titles = result['routes']['GET api/v1/titles/']
+        assert titles['queries_max'] > 0
+        assert set(titles) >= {'p50_ms', 'p95_ms', 'p99_ms', 'throughput'}
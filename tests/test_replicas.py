@@ -0,0 +1,106 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from api.metrics import collect, store
+from api.models import Title
+from api.routers import ReplicaRouter
+
+DATABASES = ['default', 'replica']
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.REPLICA_STICKY_SECONDS = 60
+
+
+def _get(client, url):
+    with CaptureQueriesContext(connections['default']) as primary, \
+            CaptureQueriesContext(connections['replica']) as replica:
+        response = client.get(url)
+    return response, len(primary), len(replica)
+
+
+@pytest.mark.django_db(transaction=True, databases=DATABASES)
+class TestReplicaRouting:
+
+    def test_reads_go_to_replica(self, client, replica, title):
+        response, primary, on_replica = _get(client, '/api/v1/titles/')
+        assert response.status_code == 200
+        assert primary == 0 and on_replica > 0, (
+            'Проверьте, что GET читает с реплики'
+        )
+
+    def test_replica_queries_counted_in_metrics(self, client, replica,
+                                                 settings, tmp_path, title):
+        settings.METRICS_DIR = str(tmp_path)
+        store.clear()
+        response, primary, on_replica = _get(client, '/api/v1/titles/')
+        counters, _ = collect()
+        store.clear()
+        key = ('yamdb_db_queries_total',
+               (('method', 'GET'), ('route', 'api/v1/titles/')))
+        assert primary == 0
+        assert counters[key] == on_replica > 0, (
+            'Проверьте, что метрики считают запросы к реплике'
+        )
+
+    def test_fresh_replica_response_not_cached(self, client, replica,
+                                               settings, title):
+        settings.REPLICA_MAX_LAG = 60
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'MISS'
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'MISS', (
+            'Проверьте, что свежие данные с реплики не кешируются'
+        )
+        settings.REPLICA_MAX_LAG = 0
+        client.get('/api/v1/titles/')
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'HIT'
+
+    def test_fresh_replica_response_has_no_validators(self, client, replica,
+                                                       settings, title):
+        settings.REPLICA_MAX_LAG = 60
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert not response.has_header('ETag'), (
+            'Проверьте, что ответ с отстающей реплики не получает ETag'
+        )
+        settings.REPLICA_MAX_LAG = 0
+        etag = client.get('/api/v1/titles/')['ETag']
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_writer_sticks_to_primary(self, user_client, client, replica,
+                                      title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        _, primary, on_replica = _get(user_client, url)
+        assert primary == 0 and on_replica > 0
+        response = user_client.post(url, data={'text': 'a', 'score': 5})
+        assert response.status_code == 201
+        response, primary, on_replica = _get(user_client, url)
+        assert response.json()['count'] == 1
+        assert primary > 0 and on_replica == 0, (
+            'Проверьте, что после записи клиент читает из основной БД'
+        )
+        _, primary, on_replica = _get(client, url)
+        assert primary == 0 and on_replica > 0, (
+            'Проверьте, что привязка к основной БД только у писавшего клиента'
+        )
+
+    def test_sticky_window_expires(self, user_client, replica, settings,
+                                   title):
+        settings.REPLICA_STICKY_SECONDS = 0
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        user_client.post(url, data={'text': 'a', 'score': 5})
+        _, primary, on_replica = _get(user_client, url)
+        assert primary == 0 and on_replica > 0
+
+    def test_auth_flows_use_primary(self, client, replica):
+        with CaptureQueriesContext(connections['replica']) as on_replica:
+            client.get('/api/v1/auth/token/')
+        assert len(on_replica) == 0
+
+    def test_without_request_reads_primary(self, replica):
+        assert ReplicaRouter().db_for_read(Title) == 'default', (
+            'Проверьте, что вне запроса чтение идёт в основную БД'
+        )
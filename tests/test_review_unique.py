@@ -0,0 +1,53 @@
+import pytest
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Review
+
+
+@pytest.mark.django_db
+class TestOneReviewPerAuthor:
+
+    def _url(self, title):
+        return f'/api/v1/titles/{title.id}/reviews/'
+
+    def test_duplicate_review_rejected(self, user_client, title):
+        data = {'text': 'Текст', 'score': 5}
+        response = user_client.post(self._url(title), data=data)
+        assert response.status_code == 201
+        response = user_client.post(self._url(title), data=data)
+        assert response.status_code == 400, (
+            'Проверьте, что повторное ревью автора на произведение '
+            'возвращает статус 400'
+        )
+        assert response.json() == {
+            'non_field_errors': ['Error: Review is already exists']
+        }
+        assert Review.objects.filter(title=title).count() == 1
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (5, 1), (
+            'Проверьте, что отклонённое ревью не меняет рейтинг'
+        )
+
+    def test_constraint_in_database(self, review):
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Review.objects.create(title=review.title, author=review.author,
+                                  text='Ещё', score=1)
+
+    def test_create_reads_title_once(self, user_client, title):
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.post(self._url(title),
+                                        data={'text': 'Текст', 'score': 5})
+        assert response.status_code == 201
+        title_reads = [q['sql'] for q in queries
+                       if q['sql'].startswith('SELECT')
+                       and 'FROM "api_title"' in q['sql']]
+        assert len(title_reads) == 1, (
+            'Проверьте, что при создании ревью произведение читается один раз'
+        )
+        assert not any('FROM "api_review"' in sql for sql in
+                       (q['sql'] for q in queries
+                        if q['sql'].startswith('SELECT'))), (
+            'Проверьте, что уникальность ревью проверяет ограничение БД, '
+            'а не отдельный запрос'
+        )
@@ -0,0 +1,67 @@
+import pytest
+
+from api.models import Genre, Title
+
+
+@pytest.fixture
+def catalogue():
+    return [
+        Title.objects.create(name='Solaris', description='A novel about a planet'),
+        Title.objects.create(name='Planet of the people',
+                             description='A story about pilots'),
+        Title.objects.create(name='Roadside Picnic',
+                             description='The zone and stalkers'),
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_results_are_ranked(self, client, catalogue):
+        response = client.get('/api/v1/titles/?search=planet')
+        assert response.status_code == 200
+        names = [item['name'] for item in response.json()['results']]
+        assert names == ['Planet of the people', 'Solaris'], (
+            'Проверьте, что совпадение в названии ранжируется выше '
+            'совпадения в описании'
+        )
+
+    def test_all_terms_must_match(self, client, catalogue):
+        response = client.get('/api/v1/titles/?search=zone stalkers')
+        names = [item['name'] for item in response.json()['results']]
+        assert names == ['Roadside Picnic']
+        response = client.get('/api/v1/titles/?search=zone planet')
+        assert response.json()['count'] == 0
+
+    def test_search_is_paginated(self, client):
+        Title.objects.bulk_create(
+            Title(name=f'Saga {i}', description='saga') for i in range(12)
+        )
+        response = client.get('/api/v1/titles/?search=saga')
+        assert response.json()['count'] == 12
+        assert len(response.json()['results']) == 10
+
+
+@pytest.mark.django_db
+class TestFuzzyNameFilter:
+
+    def test_name_filter_tolerates_typos(self, client, catalogue):
+        response = client.get('/api/v1/titles/?name=Slaris')
+        assert response.json()['count'] == 0
+        response = client.get('/api/v1/titles/?name=Slaris&fuzzy=true')
+        names = [item['name'] for item in response.json()['results']]
+        assert names == ['Solaris'], (
+            'Проверьте, что ?fuzzy=true находит название с опечаткой'
+        )
+
+    def test_genre_search_fuzzy(self, client):
+        Genre.objects.create(name='Thriller', slug='thriller')
+        Genre.objects.create(name='Drama', slug='drama')
+        response = client.get('/api/v1/genres/?search=Triller&fuzzy=1')
+        assert [item['slug'] for item in response.json()['results']] == [
+            'thriller'
+        ]
+        response = client.get('/api/v1/genres/?search=ram')
+        assert [item['slug'] for item in response.json()['results']] == [
+            'drama'
+        ]
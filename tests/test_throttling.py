@@ -0,0 +1,96 @@
+import pytest
+
+from api.throttling import BucketStore, bucket_store, parse_rate
+
+RATES = {
+    'registration_ip': '3/hour',
+    'registration_email': '2/hour',
+    'token_ip': '3/hour',
+    'token_email': '2/hour',
+}
+
+
+@pytest.fixture
+def rates(settings):
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK,
+                               'DEFAULT_THROTTLE_RATES': RATES}
+
+
+def register(client, email, **extra):
+    return client.post('/api/v1/auth/email/',
+                       {'email': email, 'username': email.split('@')[0]},
+                       **extra)
+
+
+class TestBucketStore:
+
+    def test_parse_rate(self):
+        assert parse_rate('5/hour') == (5, 3600)
+        assert parse_rate('10/s') == (10, 1)
+
+    def test_bucket_refills(self):
+        bucket_store.clear()
+        assert bucket_store.take('k', 2, 1.0, now=100) == 0
+        assert bucket_store.take('k', 2, 1.0, now=100) == 0
+        assert bucket_store.take('k', 2, 1.0, now=100) == pytest.approx(1)
+        assert bucket_store.take('k', 2, 1.0, now=101.5) == 0, (
+            'Проверьте, что корзина пополняется со временем'
+        )
+
+    def test_store_is_shared(self):
+        # Отдельный экземпляр - своё соединение, как у другого воркера.
+        bucket_store.clear()
+        other = BucketStore()
+        assert bucket_store.take('shared', 1, 0.001, now=100) == 0
+        assert other.take('shared', 1, 0.001, now=100) > 0, (
+            'Проверьте, что корзины общие для всех процессов'
+        )
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+
+    def test_email_limit(self, client, rates):
+        assert register(client, 'a@yamdb.fake').status_code == 201
+        assert register(client, 'a@yamdb.fake').status_code == 200
+        response = register(client, ' A@yamdb.fake')
+        assert response.status_code == 429, (
+            'Проверьте, что частые запросы с одним email получают 429'
+        )
+        assert int(response['Retry-After']) > 0
+
+    def test_ip_limit(self, client, rates):
+        for number in range(3):
+            assert register(client, f'u{number}@yamdb.fake').status_code == 201
+        assert register(client, 'u3@yamdb.fake').status_code == 429, (
+            'Проверьте, что частые запросы с одного IP получают 429'
+        )
+        response = register(client, 'u3@yamdb.fake',
+                            HTTP_X_FORWARDED_FOR='10.0.0.2')
+        assert response.status_code == 201, (
+            'Проверьте, что IP клиента берётся из X-Forwarded-For'
+        )
+
+    def test_fast_reject_skips_store_and_db(self, client, rates,
+                                            monkeypatch,
+                                            django_assert_num_queries):
+        # Четвёртый запрос исчерпал обе корзины, IP и email.
+        for _ in range(4):
+            client.post('/api/v1/auth/token/',
+                        {'email': 'x@yamdb.fake', 'confirmation_code': 'A'},
+                        HTTP_X_FORWARDED_FOR='10.0.0.3')
+
+        def fail(*args, **kwargs):
+            raise AssertionError('store used')
+
+        monkeypatch.setattr(bucket_store, 'take', fail)
+        with django_assert_num_queries(0):
+            response = client.post(
+                '/api/v1/auth/token/',
+                {'email': 'x@yamdb.fake', 'confirmation_code': 'A'},
+                HTTP_X_FORWARDED_FOR='10.0.0.3',
+                HTTP_AUTHORIZATION='Bearer broken',
+            )
+        assert response.status_code == 429, (
+            'Проверьте, что повторный флуд отбивается в памяти процесса'
+        )
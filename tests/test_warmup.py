@@ -0,0 +1,59 @@
+import pytest
+from django.db import OperationalError, connection
+
+from api.metrics import store
+from api.warmup import state, warm_up
+from api_yamdb.wsgi import application
+
+
+@pytest.fixture
+def cold_worker():
+    saved = dict(state)
+    state.update(ready=False, seconds=None)
+    yield
+    state.update(saved)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWarmUp:
+
+    def test_ready_after_warm_up(self, client, cold_worker, settings,
+                                 tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        store.clear()
+        response = client.get('/ready')
+        assert response.status_code == 503, (
+            'Проверьте, что /ready отвечает 503 до прогрева'
+        )
+        warm_up(application)
+        response = client.get('/ready')
+        assert response.status_code == 200
+        assert response.json()['status'] == 'ready'
+        assert not any(
+            labels and dict(labels).get('route', '').startswith('api/')
+            for _, labels in store.counters
+        ), 'Проверьте, что запросы прогрева не попадают в метрики'
+
+    def test_database_down(self, client, cold_worker, monkeypatch):
+        calls = []
+
+        def fail():
+            calls.append(1)
+            raise OperationalError('БД недоступна')
+
+        monkeypatch.setattr(connection, 'ensure_connection', fail)
+        assert warm_up(application) is False, (
+            'Проверьте, что ошибка прогрева не роняет воркер'
+        )
+        assert len(calls) == 1, (
+            'Проверьте, что при старте прогрев не повторяется: повторы '
+            'с паузами не уложились бы в timeout воркера gunicorn'
+        )
+        assert client.get('/ready').status_code == 503
+        assert len(calls) == 2, (
+            'Проверьте, что /ready повторяет прогрев'
+        )
+        monkeypatch.undo()
+        assert client.get('/ready').status_code == 200, (
+            'Проверьте, что /ready прогревает воркер, когда БД поднялась'
+        )